@@ -1,183 +1,138 @@
-import pygame
+import os
+import time
+from collections import deque
+
 import numpy as np
-import random
+import pygame
+
+from ai_worker import AIWorker
+from assets import AssetLoader, Audio, load_scaled
+from game import Game2048
+from palette import BACKGROUND_COLOR, TILE_COLORS, tile_color
+from profiler import Profiler
+from replay import Replay
 
 # Define constants
 WIDTH, HEIGHT = 900, 540
 TILE_SIZE = 55
 MARGIN = 10
-GRID_SIZE = 7
-BACKGROUND_COLOR = (187, 173, 160)
 TEXT_COLOR = (119, 110, 101)
 BLUE_COLOR = (0, 0, 255)
 LINE_COLOR = (0, 0, 0)  # Black color for the separating line
 SELECTED_COLOR = (119, 110, 101)  # color for selected text
 RADIUS = 15 # Border radius for buttons
+REPLAY_DIR = "replays"  # finished games are saved here, see replay.py
+BOOK_PATH = "book.bin"  # opening book used by the AI when present, see book.py
+WEIGHTS_PATH = "weights.npz"  # tuned evaluator weights used by the AI when present, see evaluator.py
+PARALLEL_MIN_CORES = 4  # Hard searches in parallel from this many cores, measure with `python parallel.py`
+METRICS_PATH = "metrics.jsonl"  # timings appended here while the F3 overlay is on, see profiler.py
+OVERLAY_RECT = pygame.Rect(0, 0, 300, 136)  # F3 debug overlay, over the top-left of the AI board
+BANNER_SECONDS = 3.0  # how long a banner covers the boards, play goes on under it
+RESULT_SECONDS = 5.0  # how long the result stays up before returning to the menu
+RESULT_GRACE = 1.0  # seconds before a key or click can dismiss the result
+
+# Screen states, see run()
+MENU, PLAYING, BANNER, RESULT = "menu", "playing", "banner", "result"
+
+PLAYER_KEYS = {pygame.K_UP: "up", pygame.K_DOWN: "down", pygame.K_LEFT: "left", pygame.K_RIGHT: "right"}
+
+class RenderCache:
+    """Fonts, pre-rendered tiles and the menu background, created once and reused every frame.
+
+    It also remembers what is already on screen (the last drawn board per grid
+    and the last text per HUD slot), so a frame only redraws what changed.
+    """
+
+    def __init__(self):
+        self.fonts = {}
+        self.tiles = {}
+        self.texts = {}
+        self.background = None
+        self.drawn_boards = {}
+        self.slots = {}
+        self.full_redraw = True
+        self.overlay = None
+        self.overlay_time = 0
+        self.loader = None  # AssetLoader started with the splash screen, if any
+
+    def font(self, size, name=None):
+        key = (name, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(name, size)
+        return self.fonts[key]
+
+    def text(self, message, size, color):
+        """Rendered text for a fixed label, such as a menu button."""
+        key = (message, size, color)
+        if key not in self.texts:
+            self.texts[key] = self.font(size).render(message, True, color)
+        return self.texts[key]
+
+    def tile(self, tile_value):
+        if tile_value not in self.tiles:
+            surface = pygame.Surface((TILE_SIZE, TILE_SIZE))
+            surface.fill(tile_color(tile_value))
+            if tile_value != 0:
+                label = str(tile_value)
+                text = self.font(36).render(label, True, TEXT_COLOR)
+                if len(label) > 4:  # shrink labels past 4096 to fit the tile
+                    size = 36 * (TILE_SIZE - 8) // text.get_width()
+                    text = self.font(size).render(label, True, TEXT_COLOR)
+                surface.blit(text, text.get_rect(center=(TILE_SIZE // 2, TILE_SIZE // 2)))
+            self.tiles[tile_value] = surface
+        return self.tiles[tile_value]
+
+    def prebuild_tiles(self, max_tile):
+        tile_value = 2
+        self.tile(0)
+        while tile_value <= max_tile:
+            self.tile(tile_value)
+            tile_value *= 2
+
+    def banner(self, message):
+        """Message panel for the banner state, drawn opaque so it can be redrawn in place."""
+        key = ("banner", message)
+        if key not in self.texts:
+            text = self.text(message, 48, TEXT_COLOR)
+            panel = pygame.Surface((text.get_width() + 40, text.get_height() + 24))
+            panel.fill(TILE_COLORS[2])
+            panel.blit(text, (20, 12))
+            self.texts[key] = panel
+        return self.texts[key]
+
+    def menu_background(self):
+        if self.background is None:
+            if self.loader is not None:
+                image = self.loader.image("menu")
+            else:
+                image = load_scaled("backpic.jpg", (WIDTH, HEIGHT))
+            self.background = image.convert()
+        return self.background
+
+    def text_slot(self, key, message, center_x, y, color=(62, 39, 35), size=36):
+        """Draw ``message`` centred at ``center_x`` if the slot changed; return the dirty rect or None."""
+        previous = self.slots.get(key)
+        if previous is not None and previous[0] == message:
+            return None
+        text = self.font(size).render(message, True, color)
+        if previous is not None:
+            screen.fill(BACKGROUND_COLOR, previous[1])
+        rect = screen.blit(text, (center_x - text.get_width() // 2, y))
+        self.slots[key] = (message, rect)
+        return rect if previous is None else rect.union(previous[1])
+
+    def invalidate(self):
+        """Forget what is on screen so the next frame is drawn in full."""
+        self.drawn_boards.clear()
+        self.slots.clear()
+        self.full_redraw = True
+
+
+render_cache = RenderCache()
+audio = Audio()  # sounds are loaded with the other assets, see assets.py
 
-TILE_COLORS = {
-    0: (204, 192, 179),
-    2: (238, 228, 218),
-    4: (237, 224, 200),
-    8: (242, 177, 121),
-    16: (245, 149, 99),
-    32: (245, 158, 122),
-    64: (245, 121, 72),
-    128: (237, 207, 114),
-    256: (237, 204, 97),
-    512: (237, 200, 80),
-    1024: (237, 197, 63),
-    2048: (237, 194, 46),
-    4096: (237, 191, 23),
-}
-
-# Initialize pygame
-pygame.init()
-move_sound = pygame.mixer.Sound('./move.mp3')
-move_sound.set_volume(0.5)
-# background_music =  pygame.mixer.Sound("C:\\Users\\noman traders\\OneDrive\Documents\\codes\\background music.mp3")
-pygame.mixer.music.load("./background music.mp3")
-
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("4096 Game: AI vs Player (7x7)")
-
-class Game2048:
-    def __init__(self, is_ai=False, max_tile=4096, ai_depth=3):
-        self.board = np.zeros((GRID_SIZE, GRID_SIZE), dtype=int)
-        self.max_tile = max_tile
-        self.ai_depth = ai_depth
-        self.add_random_tile()
-        self.add_random_tile()
-        self.is_ai = is_ai
-        self.move_count = 0
-
-    def add_random_tile(self):
-        empty_cells = [(i, j) for i in range(GRID_SIZE) for j in range(GRID_SIZE) if self.board[i][j] == 0]
-        if empty_cells:
-            i, j = random.choice(empty_cells)
-            self.board[i][j] = 2 if random.random() < 0.9 else 4
-
-    def move(self, direction):
-        def merge_line(line):
-            non_zero = [num for num in line if num != 0]
-            merged = []
-            skip = False
-            for i in range(len(non_zero)):
-                if skip:
-                    skip = False
-                    continue
-                if i < len(non_zero) - 1 and non_zero[i] == non_zero[i + 1]:
-                    merged.append(non_zero[i] * 2)
-                    skip = True
-                else:
-                    merged.append(non_zero[i])
-            return merged + [0] * (len(line) - len(merged))
-
-        moved = False
-        new_board = self.board.copy()
-
-        if direction == "up":
-            for col in range(GRID_SIZE):
-                line = [self.board[row][col] for row in range(GRID_SIZE)]
-                merged = merge_line(line)
-                for row in range(GRID_SIZE):
-                    new_board[row][col] = merged[row]
-        elif direction == "down":
-            for col in range(GRID_SIZE):
-                line = [self.board[row][col] for row in range(GRID_SIZE)][::-1]
-                merged = merge_line(line)
-                for row in range(GRID_SIZE):
-                    new_board[row][col] = merged[::-1][row]
-        elif direction == "left":
-            for row in range(GRID_SIZE):
-                merged = merge_line(self.board[row])
-                new_board[row] = merged
-        elif direction == "right":
-            for row in range(GRID_SIZE):
-                merged = merge_line(self.board[row][::-1])
-                new_board[row] = merged[::-1]
-
-        if not np.array_equal(self.board, new_board):
-            moved = True
-            self.move_count += 1
-            self.board = new_board
-            self.add_random_tile()
-
-        return moved
-
-    def is_game_over(self):
-        if any(0 in row for row in self.board):  # Empty spaces
-            return False
-        for direction in ["up", "down", "left", "right"]:
-            temp_game = Game2048()
-            temp_game.board = self.board.copy()
-            if temp_game.move(direction):
-                return False
-        return True
-
-    def has_won(self):
-        return np.any(self.board == self.max_tile)
-
-    def get_score(self):
-        return np.max(self.board)
-
-    # Utility function to evaluate board state
-    def evaluate(self):
-        # Weighted score calculation
-        empty_cells = len([(i, j) for i in range(GRID_SIZE) for j in range(GRID_SIZE) if self.board[i][j] == 0])
-        max_tile = np.max(self.board)
-        smoothness = -sum(abs(self.board[i][j] - self.board[i + 1][j]) for i in range(GRID_SIZE - 1) for j in range(GRID_SIZE))
-        smoothness -= sum(abs(self.board[i][j] - self.board[i][j + 1]) for i in range(GRID_SIZE) for j in range(GRID_SIZE - 1))
-        return 10 * max_tile + 2 * empty_cells + smoothness
-
-
-    # Minimax algorithm to find the best move
-    def minimax(self, depth, maximizing_player, alpha, beta):
-        if depth == 0 or self.is_game_over():
-            return self.evaluate()
-
-        moves = ["up", "down", "left", "right"]
-        if maximizing_player:
-            max_eval = -float('inf')
-            for move in moves:
-                temp_game = Game2048()
-                temp_game.board = self.board.copy()
-                if temp_game.move(move):
-                    eval_value = temp_game.minimax(depth - 1, False, alpha, beta)
-                    max_eval = max(max_eval, eval_value)
-                    alpha = max(alpha, eval_value)
-                    if beta <= alpha:
-                        break
-            return max_eval
-        else:
-            min_eval = float('inf')
-            for move in moves:
-                temp_game = Game2048()
-                temp_game.board = self.board.copy()
-                if temp_game.move(move):
-                    eval_value = temp_game.minimax(depth - 1, True, alpha, beta)
-                    min_eval = min(min_eval, eval_value)
-                    beta = min(beta, eval_value)
-                    if beta <= alpha:
-                        break
-            return min_eval
-
-    # Get the best move for AI
-    def get_best_move(self):
-        moves = ["up", "down", "left", "right"]
-        best_move = None
-        max_eval = -float('inf')
-        for move in moves:
-            temp_game = Game2048()
-            temp_game.board = self.board.copy()
-            if temp_game.move(move):
-                eval_value = temp_game.minimax(self.ai_depth, False, -float('inf'), float('inf'))
-                if eval_value > max_eval:
-                    max_eval = eval_value
-                    best_move = move
-        return best_move
-    
 def display_message(message):
-    font = pygame.font.Font(None, 48)
+    font = render_cache.font(48)
     text = font.render(message, True, BLUE_COLOR)
     text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
     screen.blit(text, text_rect)
@@ -200,41 +155,53 @@ def game_result(ai_game, player_game):
         return f"It's a tie!\nAI Moves: {ai_moves}, Player Moves: {player_moves}, Score: {player_score}"
 
 def display_board(game, offset_x):
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            tile_value = game.board[i][j]
-            pygame.draw.rect(
-                screen,
-                TILE_COLORS[tile_value],
-                pygame.Rect(offset_x + j * (TILE_SIZE + MARGIN), i * (TILE_SIZE + MARGIN), TILE_SIZE, TILE_SIZE),
-            )
-            if tile_value != 0:
-                font = pygame.font.Font(None, 36)
-                text = font.render(str(tile_value), True, TEXT_COLOR)
-                text_rect = text.get_rect(
-                    center=(offset_x + j * (TILE_SIZE + MARGIN) + TILE_SIZE // 2, i * (TILE_SIZE + MARGIN) + TILE_SIZE // 2)
-                )
-                screen.blit(text, text_rect)
+    """Blit the tiles that changed since the last frame and return their rects."""
+    board = game.board
+    drawn = render_cache.drawn_boards.get(offset_x)
+    if drawn is board:
+        return []
+    if drawn is None:
+        changed = np.ndindex(board.shape)
+    else:
+        changed = zip(*np.nonzero(board != drawn))
+    dirty = []
+    for i, j in changed:
+        position = (offset_x + j * (TILE_SIZE + MARGIN), i * (TILE_SIZE + MARGIN))
+        dirty.append(screen.blit(render_cache.tile(board[i][j]), position))
+    render_cache.drawn_boards[offset_x] = board
+    return dirty
+
+def display_profiler(profiler, dirty_rects, force):
+    """Draw the debug overlay if it is stale or was drawn over; return its rect or None."""
+    now = pygame.time.get_ticks()
+    stale = render_cache.overlay is None or now - render_cache.overlay_time >= 250
+    if stale:
+        overlay = pygame.Surface(OVERLAY_RECT.size)
+        overlay.fill((40, 40, 40))
+        font = render_cache.font(17, pygame.font.match_font('couriernew,dejavusansmono,monospace'))
+        for i, line in enumerate(profiler.overlay_lines()):
+            overlay.blit(font.render(line, True, (230, 230, 230)), (6, 4 + 16 * i))
+        render_cache.overlay = overlay
+        render_cache.overlay_time = now
+    if stale or force or OVERLAY_RECT.collidelist(dirty_rects) != -1:
+        return screen.blit(render_cache.overlay, OVERLAY_RECT)
+    return None
 
 # Menu Screen
 def display_menu(selected_mode=None, selected_ai_difficulty=None):
-    # Load the background image
-    background_image = pygame.image.load("backpic.jpg")  
-    background_image = pygame.transform.scale(background_image, (WIDTH, HEIGHT)) 
-    # Render the background image
-    screen.blit(background_image, (0, 0))
-    
-    font = pygame.font.Font(None, 48)
-    title_text = font.render("4096 Game: AI vs Player", True, (230, 220, 200))
-    
+    # Render the background image, loaded and scaled once
+    screen.blit(render_cache.menu_background(), (0, 0))
+
+    title_text = render_cache.text("4096 Game: AI vs Player", 48, (230, 220, 200))
+
     # Button Texts
-    play_1024_text = font.render("Play 1024", True, (255, 255, 255) if selected_mode != 1024 else SELECTED_COLOR)
-    play_2048_text = font.render("Play 2048", True, (255, 255, 255) if selected_mode != 2048 else SELECTED_COLOR)
-    play_4096_text = font.render("Play 4096", True, (255, 255, 255) if selected_mode != 4096 else SELECTED_COLOR)
-    difficulty_text = font.render("Select AI Difficulty:", True,  (245, 245, 220))
-    easy_text = font.render("Easy", True, (255, 255, 255) if selected_ai_difficulty != 'Easy' else SELECTED_COLOR)
-    medium_text = font.render("Medium", True, (255, 255, 255) if selected_ai_difficulty != 'Medium' else SELECTED_COLOR)
-    hard_text = font.render("Hard", True,(255, 255, 255) if selected_ai_difficulty != 'Hard' else SELECTED_COLOR)
+    play_1024_text = render_cache.text("Play 1024", 48, (255, 255, 255) if selected_mode != 1024 else SELECTED_COLOR)
+    play_2048_text = render_cache.text("Play 2048", 48, (255, 255, 255) if selected_mode != 2048 else SELECTED_COLOR)
+    play_4096_text = render_cache.text("Play 4096", 48, (255, 255, 255) if selected_mode != 4096 else SELECTED_COLOR)
+    difficulty_text = render_cache.text("Select AI Difficulty:", 48, (245, 245, 220))
+    easy_text = render_cache.text("Easy", 48, (255, 255, 255) if selected_ai_difficulty != 'Easy' else SELECTED_COLOR)
+    medium_text = render_cache.text("Medium", 48, (255, 255, 255) if selected_ai_difficulty != 'Medium' else SELECTED_COLOR)
+    hard_text = render_cache.text("Hard", 48, (255, 255, 255) if selected_ai_difficulty != 'Hard' else SELECTED_COLOR)
 
     # screen.fill(BACKGROUND_COLOR)
 
@@ -290,139 +257,199 @@ def display_menu(selected_mode=None, selected_ai_difficulty=None):
     pygame.display.flip()
     return play_1024_rect, play_2048_rect, play_4096_rect, easy_rect, medium_rect, hard_rect
 
-def start_game(mode, ai_difficulty):
-    ai_depth = 3 if ai_difficulty == 'Hard' else (2 if ai_difficulty == 'Medium' else 1)
-    ai_game = Game2048(is_ai=True, max_tile=mode, ai_depth=ai_depth)
-    player_game = Game2048(is_ai=False, max_tile=mode)
-
-    clock = pygame.time.Clock()
-    ai_move_delay = 500 if ai_difficulty == 'Easy' else (300 if ai_difficulty == 'Medium' else 0)
-    last_ai_move_time = pygame.time.get_ticks()  # Record the current time
-
-    player_start_time = pygame.time.get_ticks()
-    ai_start_time = pygame.time.get_ticks()
-
-    player_reached_max = False
-    ai_reached_max = False
-    winner_message_displayed = False
-
-    player_elapsed_time = 0
-    ai_elapsed_time = 0
-
-    def display_message(message, delay=3000):
-        """Display a message on the screen for a given duration."""
-        font = pygame.font.Font(None, 48)
-        text = font.render(message, True, TEXT_COLOR)
-        text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-        screen.blit(text, text_rect)
-        pygame.display.flip()
-        pygame.time.wait(delay)
-
-    # Main game loop
-    while True:
-        current_time = pygame.time.get_ticks()
-
-        # Calculate elapsed time for Player and AI
-        if not player_reached_max and not player_game.is_game_over():
-            player_elapsed_time = (current_time - player_start_time) // 1000
-        if not ai_reached_max and not ai_game.is_game_over():
-            ai_elapsed_time = (current_time - ai_start_time) // 1000
+class Match:
+    """One AI vs player game, advanced a frame at a time by ``run``.
+
+    Each side's clock runs on time.monotonic() until the move that wins or
+    blocks its board, so calculate_winner gets the exact time each side took.
+    The player's clock starts with the match and the AI's once its worker is
+    ready to search, so the AI is not charged for starting the worker.
+    """
+
+    def __init__(self, mode, ai_difficulty):
+        ai_depth = 3 if ai_difficulty == 'Hard' else (2 if ai_difficulty == 'Medium' else 1)
+        # Seconds of search per move. On one core depth 3 finishes inside 0.1 s on about 97% of Hard's moves
+        # (p50 0.066 s, p95 0.093 s); the rest play the depth-2 result.
+        ai_time_budget = 0.1 if ai_difficulty == 'Hard' else None
+        self.ai_game = Game2048(is_ai=True, max_tile=mode, ai_depth=ai_depth, ai_time_budget=ai_time_budget)
+        self.player_game = Game2048(is_ai=False, max_tile=mode)
+        self.replays = {"ai": Replay.start(self.ai_game), "player": Replay.start(self.player_game)}
+
+        self.ai_move_delay = 0.5 if ai_difficulty == 'Easy' else (0.3 if ai_difficulty == 'Medium' else 0)
+        self.start_times = {"ai": None, "player": time.monotonic()}  # the AI's is set in update
+        self.last_ai_move_time = None
+        self.finish_times = {"ai": None, "player": None}  # when each side won or got stuck
+        self.banners = deque()  # messages waiting for the banner state
+
+        render_cache.prebuild_tiles(mode)
+        render_cache.invalidate()
+
+        # Splitting the root costs depth on few cores (2 workers: depth 2.1 against the serial 2.6), see README.md
+        parallel = ai_difficulty == 'Hard' and (os.cpu_count() or 1) >= PARALLEL_MIN_CORES
+        self.ai_worker = AIWorker(ai_depth=ai_depth, time_budget=ai_time_budget, book_path=BOOK_PATH,
+                                  weights_path=WEIGHTS_PATH, parallel=parallel)
+        self.ai_worker.submit(self.ai_game.state)
+        self.ai_move = None
+        self.profiler = None  # F3 toggles frame and search timing
+
+    def elapsed(self, side, now):
+        start, finished = self.start_times[side], self.finish_times[side]
+        if start is None:
+            return 0.0
+        return (now if finished is None else finished) - start
+
+    def is_over(self):
+        return None not in self.finish_times.values()
+
+    def _check_finished(self, side, game):
+        """Stop ``side``'s clock if its last move won or blocked the board."""
+        if self.finish_times[side] is None and (game.has_won() or game.is_game_over()):
+            self.finish_times[side] = time.monotonic()
+            if game.has_won():
+                self.banners.append(f"{'AI' if side == 'ai' else 'Player'} has reached the max tile!")
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            if self.profiler is None:
+                self.profiler = Profiler(METRICS_PATH)
+            else:
+                self.profiler.close()
+                self.profiler = None
+                render_cache.invalidate()  # uncover the boards
+        elif event.type == pygame.KEYDOWN and self.finish_times["player"] is None:
+            direction = PLAYER_KEYS.get(event.key)
+            audio.play("move")
+            if direction is not None and self.player_game.move(direction):
+                self._check_finished("player", self.player_game)
+
+    def update(self, now):
+        """AI turn: the worker searches in the background, its move is applied once the delay has passed."""
+        if self.ai_move is None:
+            self.ai_move = self.ai_worker.poll()
+            if self.start_times["ai"] is None and self.ai_worker.ready_time is not None:
+                self.start_times["ai"] = self.last_ai_move_time = self.ai_worker.ready_time
+            if self.ai_move is not None and self.profiler is not None:
+                self.profiler.search(self.ai_worker.stats)
+        if (self.ai_move is not None and now - self.last_ai_move_time >= self.ai_move_delay
+                and self.finish_times["ai"] is None):
+            self.ai_game.move(self.ai_move)
+            self.ai_move = None
+            self.last_ai_move_time = now
+            self._check_finished("ai", self.ai_game)
+            if self.finish_times["ai"] is None:
+                self.ai_worker.submit(self.ai_game.state)
+
+    def frame(self, events, now, banner=None):
+        """Handle input, move the AI and draw one frame, with ``banner`` shown over the boards if given."""
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin_frame()
+        for event in events:
+            self.handle_event(event)
+        if profiler is not None:
+            profiler.lap("input")
+        self.update(now)
+        profiler = self.profiler  # F3 may have toggled it
+        if profiler is not None:
+            profiler.lap("ai")
+        ai_seconds = int(self.elapsed("ai", now))
+        player_seconds = int(self.elapsed("player", now))
+        if profiler is not None:
+            profiler.lap("logic")
+
+        # Only tiles and HUD text that changed are redrawn, unless the whole screen is stale
+        full_redraw = render_cache.full_redraw
+        render_cache.full_redraw = False
+        if full_redraw:
+            screen.fill(BACKGROUND_COLOR)
+        dirty_rects = display_board(self.ai_game, 0) + display_board(self.player_game, WIDTH // 2)
+
+        # Draw the black line separating the grids, on top of any redrawn tiles
+        if full_redraw or dirty_rects:
+            dirty_rects.append(pygame.draw.line(screen, LINE_COLOR, (WIDTH // 2, 0), (WIDTH // 2, HEIGHT), 5))
 
-        screen.fill(BACKGROUND_COLOR)
-        display_board(ai_game, 0)
-        display_board(player_game, WIDTH // 2)
+        # Display Timers and Move Counters
+        hud = [
+            ("ai_time", f"AI Time: {ai_seconds // 60}:{ai_seconds % 60:02}", WIDTH // 4, HEIGHT - 80),
+            ("ai_moves", f"AI Moves: {self.ai_game.move_count}", WIDTH // 4, HEIGHT - 40),
+            ("player_time", f"Player Time: {player_seconds // 60}:{player_seconds % 60:02}", 3 * WIDTH // 4, HEIGHT - 80),
+            ("player_moves", f"Player Moves: {self.player_game.move_count}", 3 * WIDTH // 4, HEIGHT - 40),
+        ]
+        for key, message, center_x, y in hud:
+            rect = render_cache.text_slot(key, message, center_x, y)
+            if rect is not None:
+                dirty_rects.append(rect)
+        if banner is not None:
+            rect = display_banner(banner, dirty_rects, full_redraw)
+            if rect is not None:
+                dirty_rects.append(rect)
+        if profiler is not None:
+            rect = display_profiler(profiler, dirty_rects, full_redraw)
+            if rect is not None:
+                dirty_rects.append(rect)
+            profiler.lap("render")
+
+        if full_redraw:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+        if profiler is not None:
+            profiler.lap("flip")
+            profiler.end_frame()
+
+    def close(self):
+        self.ai_worker.close()
+        if self.profiler is not None:
+            self.profiler.close()
+            self.profiler = None
+
+
+def display_banner(message, dirty_rects, force):
+    """Draw a banner panel in the middle of the screen if it was drawn over; return its rect or None."""
+    panel = render_cache.banner(message)
+    rect = panel.get_rect(center=(WIDTH // 2, HEIGHT // 2))
+    if force or rect.collidelist(dirty_rects) != -1:
+        return screen.blit(panel, rect)
+    return None
+
+
+def display_result(message):
+    font = render_cache.font(33, pygame.font.match_font('arial', bold=True))
+
+    # Render the winner message
+    text = font.render(message, True, BLUE_COLOR)
+    text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))  # Center it on the screen
 
-        # Draw the black line separating the grids
-        pygame.draw.line(screen, LINE_COLOR, (WIDTH // 2, 0), (WIDTH // 2, HEIGHT), 5)
+    # Ensure the text doesn't go out of the left or right edge
+    if text_rect.left < 0:
+        text_rect.left = 0
+    if text_rect.right > WIDTH:
+        text_rect.right = WIDTH
 
-        # Display Timers and Move Counters
-        font = pygame.font.Font(None, 36)
-        ai_timer_text = font.render(f"AI Time: {ai_elapsed_time // 60}:{ai_elapsed_time % 60:02}", True, (62, 39, 35))
-        player_timer_text = font.render(f"Player Time: {player_elapsed_time // 60}:{player_elapsed_time % 60:02}", True, (62, 39, 35))
+    # Prevent overflow at the bottom if necessary
+    if text_rect.bottom > HEIGHT - 50:
+        text_rect.bottom = HEIGHT - 50
+    screen.blit(text, text_rect)
+    pygame.display.flip()
 
-        ai_moves_text = font.render(f"AI Moves: {ai_game.move_count}", True, (62, 39, 35))
-        player_moves_text = font.render(f"Player Moves: {player_game.move_count}", True, (62, 39, 35))
 
-        screen.blit(ai_timer_text, (WIDTH // 4 - ai_timer_text.get_width() // 2, HEIGHT - 80))
-        screen.blit(ai_moves_text, (WIDTH // 4 - ai_moves_text.get_width() // 2, HEIGHT - 40))
-        screen.blit(player_timer_text, (3 * WIDTH // 4 - player_timer_text.get_width() // 2, HEIGHT - 80))
-        screen.blit(player_moves_text, (3 * WIDTH // 4 - player_moves_text.get_width() // 2, HEIGHT - 40))
+def save_replays(replays):
+    """Write each finished game's replay to REPLAY_DIR, named by finish time."""
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    for name, replay in replays.items():
+        replay.save(os.path.join(REPLAY_DIR, f"{stamp}-{name}.r4096"))
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            elif event.type == pygame.KEYDOWN and not player_game.is_game_over() and not player_reached_max:
-                move_sound.play()
-                if event.key == pygame.K_UP:
-                    player_game.move("up")
-                elif event.key == pygame.K_DOWN:
-                    player_game.move("down")
-                elif event.key == pygame.K_LEFT:
-                    player_game.move("left")
-                elif event.key == pygame.K_RIGHT:
-                    player_game.move("right")
-
-        # AI Turn with non-blocking delay
-        if current_time - last_ai_move_time >= ai_move_delay and not ai_game.is_game_over() and not ai_reached_max:
-            ai_move = ai_game.get_best_move()
-            ai_game.move(ai_move)
-            last_ai_move_time = current_time
-
-        pygame.display.flip()
-        clock.tick(60)
+def calculate_winner(ai_game, player_game, ai_time, player_time):
+    """Score each side as 0.7 * moves + 0.3 * seconds taken; the lower weightage wins."""
 
-        # Display Max Tile Messages
-        if player_game.has_won() and not player_reached_max:
-            player_reached_max = True
-            display_message("Player has reached the max tile!", delay=3000)
-
-        if ai_game.has_won() and not ai_reached_max:
-            ai_reached_max = True
-            display_message("AI has reached the max tile!", delay=3000)
-
-        # End game when both have finished
-        if player_game.is_game_over() and not player_reached_max:
-            player_reached_max = True
-        if ai_game.is_game_over() and not ai_reached_max:
-            ai_reached_max = True
-
-        if player_reached_max and ai_reached_max:
-            if not winner_message_displayed:
-                winner_message = calculate_winner(ai_game, player_game, player_elapsed_time, ai_elapsed_time)
-                font = pygame.font.Font(pygame.font.match_font('arial', bold=True), 33)
-
-                # Render the winner message
-                text = font.render(winner_message, True, BLUE_COLOR)
-                text_rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))  # Center it on the screen
-
-                # Ensure the text doesn't go out of the left or right edge
-                if text_rect.left < 0:
-                    text_rect.left = 0
-                if text_rect.right > WIDTH:
-                    text_rect.right = WIDTH
-
-                # Prevent overflow at the bottom if necessary
-                if text_rect.bottom > HEIGHT - 50:
-                    text_rect.bottom = HEIGHT - 50
-                screen.blit(text, text_rect)
-
-                pygame.display.flip()
-                pygame.time.wait(5000)  # Display result for 5 seconds
-                winner_message_displayed = True
-            return
-def calculate_winner(ai_game, player_game, elapsed_time, total_time):
-
-    def calculate_weightage(moves, time_taken, max_time):
+    def calculate_weightage(moves, time_taken):
         move_weight = 0.7 * moves
-        time_weight = 0.3 * time_taken 
+        time_weight = 0.3 * time_taken
         return move_weight + time_weight
 
-    ai_time_taken = total_time - elapsed_time
-    player_time_taken = total_time - elapsed_time
-
-    ai_weightage = calculate_weightage(ai_game.move_count, ai_time_taken, total_time)
-    player_weightage = calculate_weightage(player_game.move_count, player_time_taken, total_time)
+    ai_weightage = calculate_weightage(ai_game.move_count, ai_time)
+    player_weightage = calculate_weightage(player_game.move_count, player_time)
 
     if ai_weightage < player_weightage:
         return f"AI wins! Weightage: {ai_weightage:.2f} (AI) vs {player_weightage:.2f} (Player)"
@@ -431,44 +458,116 @@ def calculate_winner(ai_game, player_game, elapsed_time, total_time):
     else:
         return "It's a tie!"
 
-if __name__ == "__main__":
-    pygame.mixer.music.play(-1)
-    # Load and display the image for 5 seconds
-    intro_image = pygame.image.load("4096icon.png")  # Replace with your image path
-    intro_image = pygame.transform.scale(intro_image, (WIDTH, HEIGHT))  # Scale the image to fit the screen
-    screen.blit(intro_image, (0, 0))
-    pygame.display.flip()  # Update the screen
-    pygame.time.wait(5000)  # Wait for 5 seconds
+def run():
+    """Menu and match loop, one frame per iteration.
 
+    The screen is in one of four states: MENU until a mode and difficulty are
+    picked, then PLAYING; BANNER while a timed message covers the boards
+    (both sides keep playing under it); RESULT once both sides are done,
+    until RESULT_SECONDS pass or, after RESULT_GRACE, a click or a key other
+    than the arrows returns to the menu, so a late arrow press does not skip
+    it. Nothing waits: every state pumps events and draws at the frame rate.
+    """
+    clock = pygame.time.Clock()
+    state = MENU
     selected_mode = None
     selected_ai_difficulty = None
+    match = None
+    banner, banner_end = None, 0.0
+    result_start = result_end = 0.0
 
     while True:
-        play_1024_rect, play_2048_rect, play_4096_rect, easy_rect, medium_rect, hard_rect = display_menu(selected_mode, selected_ai_difficulty)
+        now = time.monotonic()
+        events = pygame.event.get()
+        if any(event.type == pygame.QUIT for event in events):
+            if match is not None:
+                match.close()
+            pygame.quit()
+            exit()
+
+        if state == MENU:
+            play_1024_rect, play_2048_rect, play_4096_rect, easy_rect, medium_rect, hard_rect = display_menu(selected_mode, selected_ai_difficulty)
+
+            # Event handling for menu
+            for event in events:
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    # Get mouse position
+                    x, y = pygame.mouse.get_pos()
+
+                    # Check if any menu item is clicked
+                    if play_1024_rect.collidepoint(x, y):  # Check if the click is within the "Play 1024" button
+                        selected_mode = 1024
+                    elif play_2048_rect.collidepoint(x, y):  # Check if the click is within the "Play 2048" button
+                        selected_mode = 2048
+                    elif play_4096_rect.collidepoint(x, y):  # Check if the click is within the "Play 4096" button
+                        selected_mode = 4096
+                    elif easy_rect.collidepoint(x, y):  # Check if the click is within the "Easy" difficulty button
+                        selected_ai_difficulty = 'Easy'
+                    elif medium_rect.collidepoint(x, y):  # Check if the click is within the "Medium" difficulty button
+                        selected_ai_difficulty = 'Medium'
+                    elif hard_rect.collidepoint(x, y):  # Check if the click is within the "Hard" difficulty button
+                        selected_ai_difficulty = 'Hard'
+
+            if selected_mode and selected_ai_difficulty:
+                match = Match(selected_mode, selected_ai_difficulty)
+                state = PLAYING
+
+        elif state in (PLAYING, BANNER):
+            match.frame(events, now, banner if state == BANNER else None)
+            if state == BANNER and now >= banner_end:
+                state = PLAYING
+                render_cache.invalidate()  # uncover the boards
+            if state == PLAYING and match.banners:
+                banner, banner_end = match.banners.popleft(), now + BANNER_SECONDS
+                state = BANNER
+                render_cache.invalidate()  # draw the banner on the next frame
+            elif state == PLAYING and match.is_over():
+                match.close()
+                save_replays(match.replays)
+                display_result(calculate_winner(match.ai_game, match.player_game,
+                                                match.elapsed("ai", now), match.elapsed("player", now)))
+                result_start, result_end = now, now + RESULT_SECONDS
+                state = RESULT
+
+        elif state == RESULT:
+            dismissed = now >= result_start + RESULT_GRACE and any(
+                event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.KEYDOWN and event.key not in PLAYER_KEYS
+                for event in events)
+            if now >= result_end or dismissed:
+                match = None
+                selected_mode = None
+                selected_ai_difficulty = None
+                state = MENU
 
-        # Event handling for menu
+        clock.tick(60)
+
+if __name__ == "__main__":
+    # Initialize pygame here rather than at import, so AI worker processes
+    # that re-import this module never open a window or the mixer. Only the
+    # display and fonts are needed up front; the mixer starts with the assets.
+    pygame.display.init()
+    pygame.font.init()
+
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("4096 Game: AI vs Player (7x7)")
+
+    # Show the splash while the other assets load in the background; it ends
+    # when they are ready, or earlier on a key press or click
+    loader = AssetLoader({"menu": ("backpic.jpg", (WIDTH, HEIGHT))}, audio,
+                         {"move": ("./move.mp3", 0.5)}, "./background music.mp3")
+    loader.start()
+    render_cache.loader = loader
+    screen.blit(load_scaled("4096icon.png", (WIDTH, HEIGHT)), (0, 0))
+    pygame.display.flip()
+    splash_clock = pygame.time.Clock()
+    skipped = False
+    while not skipped and not loader.done.is_set():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                # Get mouse position
-                x, y = pygame.mouse.get_pos()
-
-                # Check if any menu item is clicked
-                if play_1024_rect.collidepoint(x, y):  # Check if the click is within the "Play 1024" button
-                    selected_mode = 1024
-                elif play_2048_rect.collidepoint(x, y):  # Check if the click is within the "Play 2048" button
-                    selected_mode = 2048
-                elif play_4096_rect.collidepoint(x, y):  # Check if the click is within the "Play 4096" button
-                    selected_mode = 4096
-                elif easy_rect.collidepoint(x, y):  # Check if the click is within the "Easy" difficulty button
-                    selected_ai_difficulty = 'Easy'
-                elif medium_rect.collidepoint(x, y):  # Check if the click is within the "Medium" difficulty button
-                    selected_ai_difficulty = 'Medium'
-                elif hard_rect.collidepoint(x, y):  # Check if the click is within the "Hard" difficulty button
-                    selected_ai_difficulty = 'Hard'
-
-        if selected_mode and selected_ai_difficulty:
-            start_game(selected_mode, selected_ai_difficulty)
-            break
\ No newline at end of file
+            elif event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                skipped = True
+        splash_clock.tick(60)
+
+    run()
@@ -0,0 +1,128 @@
+"""Background process that runs the AI's search off the render loop.
+
+The game loop submits the AI board with ``submit`` as soon as it changes and
+picks the answer up later with ``poll``, so a long search never holds up a
+frame. Submitting a new board cancels any search still running for an older
+one. Because the board is submitted right after the AI moves, the search runs
+while the move-delay timer counts down.
+
+Starting the worker and loading the book and weights takes about half a
+second, so the worker reports when it is ready to search and ``ready_time``
+records when ``poll`` first saw that.
+
+With ``parallel=True`` the search is a ParallelSearch whose process pool does
+the work, so the worker itself runs as a thread that only hands out subtrees
+and waits (a daemon process could not start the pool). The pool stays up for
+the worker's lifetime, i.e. one game session.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from types import SimpleNamespace
+
+import bitboard
+from book import OpeningBook
+from evaluator import load_weights, tuned_terms
+from expectimax import ExpectimaxSearch
+from parallel import ParallelSearch, scaled_cutoff, scaled_depth
+
+
+def _serve(requests, responses, latest, ai_depth, time_budget, book_path, weights_path, parallel=False):
+    weights = load_weights(weights_path)
+    terms = None if weights is None else tuned_terms(bitboard.DEFAULT, weights)
+    if parallel:
+        depth = scaled_depth(ai_depth)
+        search = ParallelSearch(max_depth=depth, prob_cutoff=scaled_cutoff(depth, ai_depth), time_budget=time_budget,
+                                terms=terms)
+    else:
+        search = ExpectimaxSearch(max_depth=ai_depth, time_budget=time_budget, terms=terms)
+    if book_path is not None:
+        search.book = OpeningBook(book_path, weights=weights)
+        search.book_depth = ai_depth  # the scaled parallel depth is a limit the budget rarely reaches
+    responses.put(None)  # ready
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                return
+            request_id, state = request
+            if latest.value != request_id:
+                continue  # superseded before it started
+            search.should_stop = lambda: latest.value != request_id
+            start = time.perf_counter()
+            direction, _ = search.best_move(state)
+            if latest.value == request_id:
+                responses.put((request_id, direction, dict(search.stats, time=time.perf_counter() - start)))
+    finally:
+        if parallel:
+            search.close()
+
+
+class AIWorker:
+    def __init__(self, ai_depth=3, time_budget=None, book_path=None, weights_path=None, parallel=False):
+        self.parallel = parallel
+        if parallel:
+            self.requests = queue.Queue()
+            self.responses = queue.Queue()
+            self.latest = SimpleNamespace(value=0)
+            self.process = threading.Thread(
+                target=_serve,
+                args=(self.requests, self.responses, self.latest, ai_depth, time_budget, book_path, weights_path,
+                      True),
+                daemon=True,
+            )
+        else:
+            # Spawn rather than fork so the worker does not inherit pygame's
+            # display and signal handlers from the game process
+            context = multiprocessing.get_context("spawn")
+            self.requests = context.Queue()
+            self.responses = context.Queue()
+            self.latest = context.Value("i", 0, lock=False)
+            self.process = context.Process(
+                target=_serve,
+                args=(self.requests, self.responses, self.latest, ai_depth, time_budget, book_path, weights_path),
+                daemon=True,
+            )
+        self.pending = None
+        self.stats = {}
+        self.ready_time = None  # time.monotonic() when poll first saw the worker ready to search
+        self.process.start()
+
+    def submit(self, state):
+        """Start searching ``state``, cancelling any earlier request."""
+        request_id = self.latest.value + 1
+        self.latest.value = request_id
+        self.pending = request_id
+        self.requests.put((request_id, state))
+
+    def poll(self):
+        """Return the best move for the last submitted board, or None if it is not ready."""
+        while True:
+            try:
+                response = self.responses.get_nowait()
+            except queue.Empty:
+                break
+            if response is None:
+                self.ready_time = time.monotonic()
+                continue
+            request_id, direction, stats = response
+            if request_id == self.pending:
+                self.pending = None
+                self.stats = stats
+                return direction
+        if not self.process.is_alive():
+            raise RuntimeError("AI worker exited")
+        return None
+
+    def cancel(self):
+        self.latest.value += 1
+        self.pending = None
+
+    def close(self):
+        self.cancel()
+        self.requests.put(None)
+        self.process.join(timeout=1)
+        if self.process.is_alive() and not self.parallel:
+            self.process.terminate()
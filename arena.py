@@ -0,0 +1,294 @@
+"""AI-vs-AI arena: rate search configurations against each other.
+
+Every configuration plays one game per seed, and every pair of
+configurations is scored on each seed, so both sides of a pairing start
+from the same board and their n-th spawns use the same two random draws
+(see Game2048.add_random_tile). A game beats another from the same seed if
+it won and the other did not, won in fewer moves, or, when neither won,
+reached a bigger tile or lasted longer.
+
+Games run concurrently across a process pool. Elo ratings are updated
+online as each pairing is decided, and the summary gives each pair's
+record with its likelihood of superiority (LOS). An LOS above 0.95 is the
+usual bar for calling one configuration stronger.
+
+A configuration is written ``name:key=value,...`` with the keys depth,
+budget (seconds per move) and weights (an evaluator.py weights file):
+
+    python arena.py d1:depth=1 d2:depth=2 tuned:depth=1,weights=weights.npz --seeds 50 --size 5 --max-tile 2048
+    python arena.py d1:depth=1 d2:depth=2 --seeds 20 --dashboard   # live mini-boards of the running games
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from itertools import combinations
+
+import bitboard
+from headless import play_game, power_of_two
+from palette import BACKGROUND_COLOR, tile_color
+
+UPDATE_INTERVAL = 0.1  # seconds between board updates a worker sends to the dashboard
+
+_updates = None  # dashboard queue in each pool process, or None without a dashboard
+
+
+class Config:
+    """One AI setup: search depth, optional time budget and optional evaluator weights file."""
+
+    def __init__(self, name, depth=2, time_budget=None, weights=None):
+        self.name = name
+        self.depth = depth
+        self.time_budget = time_budget
+        self.weights = weights
+
+    def __repr__(self):
+        return f"Config({self.name!r}, depth={self.depth}, time_budget={self.time_budget}, weights={self.weights!r})"
+
+
+def parse_config(text):
+    """Config from ``name:key=value,...``."""
+    name, _, options = text.partition(":")
+    if not name:
+        raise argparse.ArgumentTypeError(f"{text!r} has no name")
+    config = Config(name)
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if key == "depth":
+            config.depth = int(value)
+        elif key == "budget":
+            config.time_budget = float(value)
+        elif key == "weights":
+            config.weights = value
+        else:
+            raise argparse.ArgumentTypeError(f"unknown option {key!r} in {text!r}")
+    return config
+
+
+def _init_worker(updates):
+    global _updates
+    _updates = updates
+
+
+def play(job):
+    """Play one configuration's game on one seed and return its result row."""
+    config, seed, size, max_tile, max_moves = job
+    last_update, state = time.perf_counter(), None
+
+    def report(game):
+        nonlocal last_update, state
+        state = game.state
+        if time.perf_counter() - last_update >= UPDATE_INTERVAL:
+            _updates.put((os.getpid(), config.name, seed, state))
+            last_update = time.perf_counter()
+
+    row = play_game(seed, seed, max_tile, config.depth, config.time_budget, max_moves, size, config.weights,
+                    None if _updates is None else report)
+    if state is not None:
+        _updates.put((os.getpid(), config.name, seed, state))
+    return {"config": config.name, **{field: row[field] for field in ("seed", "moves", "max_tile", "won", "wall_time")}}
+
+
+def outcome(a, b):
+    """Score of result ``a`` against result ``b`` from the same seed: 1 win, 0.5 draw, 0 loss."""
+    strength_a, strength_b = _strength(a), _strength(b)
+    return 1.0 if strength_a > strength_b else 0.0 if strength_a < strength_b else 0.5
+
+
+def _strength(result):
+    # A win counts fewer moves as better, a loss more moves survived
+    moves = -result["moves"] if result["won"] else result["moves"]
+    return result["won"], result["max_tile"], moves
+
+
+class Ratings:
+    """Online Elo ratings and head-to-head records."""
+
+    def __init__(self, names, k=16, initial=1500):
+        self.names = list(names)
+        self.k = k
+        self.ratings = dict.fromkeys(self.names, float(initial))
+        self.records = {pair: [0, 0, 0] for pair in combinations(self.names, 2)}  # wins, draws, losses of the first
+
+    def update(self, a, b, score):
+        """Record ``a`` scoring ``score`` against ``b`` and move both ratings."""
+        if (a, b) not in self.records:
+            a, b, score = b, a, 1 - score
+        expected = 1 / (1 + 10 ** ((self.ratings[b] - self.ratings[a]) / 400))
+        self.ratings[a] += self.k * (score - expected)
+        self.ratings[b] -= self.k * (score - expected)
+        self.records[a, b][0 if score == 1 else 1 if score == 0.5 else 2] += 1
+
+    @staticmethod
+    def los(wins, losses):
+        """Likelihood that the side with ``wins`` is stronger; draws carry no information."""
+        if wins + losses == 0:
+            return 0.5
+        return 0.5 * (1 + math.erf((wins - losses) / math.sqrt(2 * (wins + losses))))
+
+    def summary(self):
+        lines = ["rating  config"]
+        for name in sorted(self.names, key=self.ratings.get, reverse=True):
+            lines.append(f"{self.ratings[name]:6.0f}  {name}")
+        lines.append("")
+        lines.append("pair                          W-D-L     LOS")
+        for (a, b), (wins, draws, losses) in self.records.items():
+            lines.append(f"{a + ' vs ' + b:<28}{wins:>3}-{draws}-{losses:<5}{self.los(wins, losses):6.3f}")
+        return "\n".join(lines)
+
+
+def run(configs, seeds, size=bitboard.GRID_SIZE, max_tile=4096, max_moves=None, workers=None, updates=None,
+        idle=None):
+    """Yield (result, pairings) as games finish, where pairings are (a, b, score of a) decided by the result.
+
+    Jobs go out seed by seed so pairings are decided early. ``idle`` is
+    called about every UPDATE_INTERVAL while no game finishes.
+    """
+    jobs = [(config, seed, size, max_tile, max_moves) for seed in seeds for config in configs]
+    order = {config.name: i for i, config in enumerate(configs)}
+    finished = {}  # seed -> {config name: result}
+    # Spawn so the workers never inherit the dashboard's pygame state
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, _init_worker, (updates,)) as pool:
+        results = pool.imap_unordered(play, jobs)
+        while True:
+            try:
+                result = results.next(timeout=UPDATE_INTERVAL)
+            except multiprocessing.TimeoutError:
+                if idle is not None:
+                    idle()
+                continue
+            except StopIteration:
+                return
+            same_seed = finished.setdefault(result["seed"], {})
+            pairings = []
+            for name, other in same_seed.items():
+                if order[name] < order[result["config"]]:
+                    pairings.append((name, result["config"], outcome(other, result)))
+                else:
+                    pairings.append((result["config"], name, outcome(result, other)))
+            same_seed[result["config"]] = result
+            yield result, pairings
+
+
+class Dashboard:
+    """Thumbnails of the games in progress, one per worker process, redrawn when their board changes."""
+
+    CELL = 8  # pixels per cell
+    LABEL = 16  # pixels of caption under each board
+
+    def __init__(self, slots, size, max_tile):
+        import pygame
+
+        self.pygame = pygame
+        self.layout = bitboard.get_layout(size, max_tile)
+        self.board_size = size * self.CELL
+        self.columns = math.ceil(math.sqrt(slots))
+        rows = math.ceil(slots / self.columns)
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((self.columns * (self.board_size + self.CELL) + self.CELL,
+                                               rows * (self.board_size + self.LABEL + self.CELL) + self.CELL))
+        pygame.display.set_caption("4096 arena")
+        self.screen.fill(BACKGROUND_COLOR)
+        pygame.display.flip()
+        self.font = pygame.font.Font(None, self.LABEL)
+        self.slots = {}  # worker pid -> thumbnail index
+        self.drawn = {}  # thumbnail index -> (config name, seed, state) on screen
+
+    def update(self, updates):
+        """Drain pending board updates and redraw the thumbnails that changed."""
+        latest = {}
+        while True:
+            try:
+                pid, name, seed, state = updates.get_nowait()
+            except queue.Empty:
+                break
+            latest[pid] = (name, seed, state)
+        dirty = []
+        for pid, shown in latest.items():
+            index = self.slots.setdefault(pid, len(self.slots))
+            if self.drawn.get(index) != shown:
+                dirty.append(self._draw(index, *shown))
+                self.drawn[index] = shown
+        self.pygame.event.pump()  # keep the window responsive
+        if dirty:
+            self.pygame.display.update(dirty)
+
+    def _draw(self, index, name, seed, state):
+        pygame = self.pygame
+        left = self.CELL + (index % self.columns) * (self.board_size + self.CELL)
+        top = self.CELL + (index // self.columns) * (self.board_size + self.LABEL + self.CELL)
+        area = pygame.Rect(left, top, self.board_size, self.board_size + self.LABEL)
+        self.screen.fill(BACKGROUND_COLOR, area)
+        for (i, j), value in zip(((i, j) for i in range(self.layout.size) for j in range(self.layout.size)),
+                                 self.layout.to_array(state).ravel()):
+            cell = (left + j * self.CELL, top + i * self.CELL, self.CELL - 1, self.CELL - 1)
+            self.screen.fill(tile_color(int(value)), cell)
+        caption = self.font.render(f"{name} #{seed}", True, (62, 39, 35))
+        self.screen.blit(caption, (left, top + self.board_size + 2))
+        return area
+
+    def close(self):
+        self.pygame.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rate AI configurations against each other on shared seeds.")
+    parser.add_argument("configs", nargs="+", type=parse_config, help="name:depth=N,budget=S,weights=PATH")
+    parser.add_argument("--seeds", type=int, default=20, help="games per configuration")
+    parser.add_argument("--seed", type=int, default=0, help="first seed; game i of every configuration uses seed + i")
+    parser.add_argument("--size", type=int, default=bitboard.GRID_SIZE, help="board size (N x N)")
+    parser.add_argument("--max-tile", type=power_of_two, default=4096, help="target tile, any power of two")
+    parser.add_argument("--max-moves", type=int, default=None, help="stop a game after this many moves")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--k", type=float, default=16, help="Elo K-factor")
+    parser.add_argument("--out", default=None, help="append one JSON line per game to this file")
+    parser.add_argument("--dashboard", action="store_true", help="show the running games in a pygame window")
+    args = parser.parse_args(argv)
+
+    names = [config.name for config in args.configs]
+    if len(set(names)) != len(names):
+        parser.error("configuration names must be unique")
+    ratings = Ratings(names, args.k)
+    updates = dashboard = None
+    if args.dashboard:
+        updates = multiprocessing.get_context("spawn").Queue()
+        dashboard = Dashboard(args.workers or os.cpu_count() or 1, args.size, args.max_tile)
+    out = None if args.out is None else open(args.out, "a")
+
+    games = len(args.configs) * args.seeds
+    played = 0
+    start = time.perf_counter()
+    try:
+        for result, pairings in run(args.configs, range(args.seed, args.seed + args.seeds), args.size, args.max_tile,
+                                    args.max_moves, args.workers, updates,
+                                    None if dashboard is None else lambda: dashboard.update(updates)):
+            for a, b, score in pairings:
+                ratings.update(a, b, score)
+            if out is not None:
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+            if dashboard is not None:
+                dashboard.update(updates)
+            played += 1
+            leader = max(names, key=ratings.ratings.get)
+            print(f"\r{played}/{games} games, leader {leader} ({ratings.ratings[leader]:.0f})", end="", file=sys.stderr)
+    finally:
+        if out is not None:
+            out.close()
+        if dashboard is not None:
+            dashboard.close()
+    print(file=sys.stderr)
+    print(f"{played} games in {time.perf_counter() - start:.1f}s")
+    print(ratings.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
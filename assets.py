@@ -0,0 +1,113 @@
+"""Images and audio for Main.py, loaded off the startup path.
+
+Images are decoded and scaled once, and the raw pixels are kept in CACHE_DIR
+so later runs skip the decoder and the scaler. An AssetLoader thread loads
+the images and the audio while the splash screen is up. Audio is optional,
+and without a sound device the game runs silently.
+
+Nothing here touches the display or the mixer at import.
+"""
+
+import os
+import struct
+import threading
+
+import pygame
+
+CACHE_DIR = "asset_cache"
+CACHE_HEADER = struct.Struct("<qHHB")  # source mtime_ns, width, height, has alpha
+
+
+def load_scaled(path, size, cache_dir=CACHE_DIR):
+    """Image at ``path`` scaled to ``size``, read from the cache unless the source is newer."""
+    mtime = os.stat(path).st_mtime_ns
+    cache_path = os.path.join(cache_dir, "%s.%dx%d.raw" % (os.path.basename(path), size[0], size[1]))
+    try:
+        with open(cache_path, "rb") as f:
+            data = f.read()
+        cached_mtime, width, height, alpha = CACHE_HEADER.unpack_from(data)
+        pixels = data[CACHE_HEADER.size:]
+        mode = "RGBA" if alpha else "RGB"
+        if (cached_mtime, width, height) == (mtime, *size) and len(pixels) == width * height * len(mode):
+            return pygame.image.frombytes(pixels, size, mode)
+    except (OSError, struct.error):
+        pass
+
+    surface = pygame.transform.scale(pygame.image.load(path), size)
+    alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+    mode = "RGBA" if alpha else "RGB"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = "%s.%d.tmp" % (cache_path, threading.get_ident())
+        with open(tmp, "wb") as f:
+            f.write(CACHE_HEADER.pack(mtime, *size, alpha))
+            f.write(pygame.image.tobytes(surface, mode))
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # a read-only checkout just decodes every time
+    return surface
+
+
+class Audio:
+    """Named sound effects; play() is a no-op until a sound is loaded, or if there is no audio device."""
+
+    def __init__(self):
+        self.sounds = {}
+
+    def load(self, sounds, music=None):
+        """Open the mixer, load ``sounds`` ({name: (path, volume)}) and loop ``music`` if given."""
+        try:
+            pygame.mixer.init()
+            for name, (path, volume) in sounds.items():
+                sound = pygame.mixer.Sound(path)
+                sound.set_volume(volume)
+                self.sounds[name] = sound
+            if music is not None:
+                pygame.mixer.music.load(music)
+                pygame.mixer.music.play(-1)
+        except pygame.error:
+            pass
+
+    def play(self, name):
+        sound = self.sounds.get(name)
+        if sound is not None:
+            sound.play()
+
+
+class AssetLoader(threading.Thread):
+    """Loads images ({name: (path, size)}) and then the audio in the background.
+
+    ``images_ready`` is set once the images are decoded and ``done`` once
+    everything is loaded, whether it succeeded or not.
+    """
+
+    def __init__(self, images, audio, sounds=None, music=None):
+        super().__init__(daemon=True)
+        self.image_specs = images
+        self.audio = audio
+        self.sounds = sounds or {}
+        self.music = music
+        self.images = {}
+        self.error = None
+        self.images_ready = threading.Event()
+        self.done = threading.Event()
+
+    def run(self):
+        try:
+            for name, (path, size) in self.image_specs.items():
+                self.images[name] = load_scaled(path, size)
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.images_ready.set()
+        try:
+            self.audio.load(self.sounds, self.music)
+        finally:
+            self.done.set()
+
+    def image(self, name):
+        """The decoded image ``name``, waiting for the loader if it is still running."""
+        self.images_ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self.images[name]
@@ -0,0 +1,78 @@
+"""Vectorized moves and evaluation over stacks of boards.
+
+Boards are (N, rows, cols) integer arrays of tile values, the same layout as
+Game2048.board stacked along a leading axis. Every function works on the
+whole stack at once; the only Python loops run over the columns of a line.
+"""
+
+import numpy as np
+
+DIRECTIONS = ("up", "down", "left", "right")
+
+
+def _compact(lines):
+    # Stable sort on "is empty" pushes tiles to the left and keeps their order
+    order = np.argsort(lines == 0, axis=-1, kind="stable")
+    return np.take_along_axis(lines, order, axis=-1)
+
+
+def _slide_left(boards):
+    n, rows, cols = boards.shape
+    lines = _compact(boards.reshape(n * rows, cols))
+    scores = np.zeros(n * rows, dtype=lines.dtype)
+    for j in range(cols - 1):
+        merge = (lines[:, j] != 0) & (lines[:, j] == lines[:, j + 1])
+        lines[merge, j] *= 2
+        lines[merge, j + 1] = 0
+        scores += np.where(merge, lines[:, j], 0)
+    lines = _compact(lines)
+    return lines.reshape(n, rows, cols), scores.reshape(n, rows).sum(axis=1)
+
+
+# Each direction is a slide to the left in a reoriented view of the board,
+# stored as (to_view, from_view) pairs.
+_VIEWS = {
+    "left": (lambda b: b, lambda b: b),
+    "right": (lambda b: b[:, :, ::-1], lambda b: b[:, :, ::-1]),
+    "up": (lambda b: b.transpose(0, 2, 1), lambda b: b.transpose(0, 2, 1)),
+    "down": (lambda b: b[:, ::-1, :].transpose(0, 2, 1), lambda b: b.transpose(0, 2, 1)[:, ::-1, :]),
+}
+
+
+def move_boards(boards, direction=None):
+    """Slide every board in ``direction``.
+
+    Returns ``(boards, moved, scores)``: the resulting boards, a boolean mask
+    of the boards that changed, and the sum of the tiles created by merges.
+    With ``direction=None`` all four directions are computed and each result
+    gains a leading axis ordered as ``DIRECTIONS``.
+    """
+    boards = np.asarray(boards)
+    if direction is None:
+        results = [move_boards(boards, d) for d in DIRECTIONS]
+        return tuple(np.stack(part) for part in zip(*results))
+
+    to_view, from_view = _VIEWS[direction]
+    moved_view, scores = _slide_left(np.ascontiguousarray(to_view(boards)))
+    new_boards = np.ascontiguousarray(from_view(moved_view))
+    moved = np.any(new_boards != boards, axis=(1, 2))
+    return new_boards, moved, scores
+
+
+def evaluate_boards(boards):
+    """Game2048.evaluate for every board in the stack."""
+    boards = np.asarray(boards)
+    empty_cells = np.count_nonzero(boards == 0, axis=(1, 2))
+    max_tile = boards.max(axis=(1, 2))
+    smoothness = -np.abs(np.diff(boards, axis=1)).sum(axis=(1, 2))
+    smoothness -= np.abs(np.diff(boards, axis=2)).sum(axis=(1, 2))
+    return 10 * max_tile + 2 * empty_cells + smoothness
+
+
+def can_move_boards(boards):
+    """True for every board that has an empty cell or two equal neighbours."""
+    boards = np.asarray(boards)
+    empty = np.any(boards == 0, axis=(1, 2))
+    vertical = np.any(boards[:, 1:, :] == boards[:, :-1, :], axis=(1, 2))
+    horizontal = np.any(boards[:, :, 1:] == boards[:, :, :-1], axis=(1, 2))
+    return empty | vertical | horizontal
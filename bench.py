@@ -0,0 +1,200 @@
+"""Benchmarks for the Game2048 hot paths with regression baselines.
+
+    python bench.py --save          # measure and write bench_baseline.json
+    python bench.py                 # measure and compare against the baseline
+
+Every benchmark runs on a fixed corpus of seeded positions from depth-1
+self-play: open boards (moves 150 and 400, about 30 of 49 cells empty) and
+crowded boards (at most CROWDED_EMPTY empty cells, which depth-1 games first
+reach after roughly 1,000 moves). Crowded boards are where Hard's searches
+are slowest, so search latency is reported for each kind separately. Numbers
+are comparable between runs on the same machine. A
+comparison exits with status 1 when any benchmark is worse than its baseline
+by more than ``--threshold`` (default 20%).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import bitboard
+from game import Game2048
+
+DIRECTIONS = ("up", "down", "left", "right")
+DEFAULT_BASELINE = "bench_baseline.json"
+CROWDED_EMPTY = 8  # a board with at most this many empty cells counts as crowded
+
+
+def build_corpus(games=4, seed=1000, crowded_per_game=3, spacing=100, max_moves=5000):
+    """Seeded (open, crowded) positions: moves 150 and 400, and boards with at most CROWDED_EMPTY empty cells.
+
+    Crowded boards are taken at least ``spacing`` moves apart, skipping boards
+    with no legal move. The target tile is out of reach so games are not cut
+    short by a win.
+    """
+    open_boards, crowded = [], []
+    for i in range(games):
+        game = Game2048(is_ai=True, ai_depth=1, seed=seed + i, max_tile=32768)
+        taken, last_taken = 0, -spacing
+        while not game.is_game_over() and game.move_count < max_moves and taken < crowded_per_game:
+            game.move(game.get_best_move())
+            if game.move_count in (150, 400):
+                open_boards.append(game.state)
+            if (game.move_count - last_taken >= spacing and not game.is_game_over()
+                    and len(game.layout.empty_cells(game.state)) <= CROWDED_EMPTY):
+                crowded.append(game.state)
+                taken, last_taken = taken + 1, game.move_count
+    return open_boards, crowded
+
+
+def stuck_board(seed):
+    """A full board with no legal move: a checkerboard of two different exponents."""
+    rng = np.random.default_rng(seed)
+    exponents = [int(e) for e in rng.choice(np.arange(1, 12), 2, replace=False)]
+    state = 0
+    for i, shift in enumerate(bitboard.CELL_SHIFTS):
+        row, col = divmod(i, bitboard.GRID_SIZE)
+        state |= exponents[(row + col) % 2] << shift
+    return state
+
+
+def rate(func, min_time=0.2, repeats=3):
+    """Best calls per second of ``func`` over ``repeats`` timed runs."""
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+def cycle(game, positions, action):
+    """Call ``action(game)`` on each corpus position in turn."""
+    index = [0]
+
+    def step():
+        game.state = positions[index[0] % len(positions)]
+        index[0] += 1
+        action(game)
+    return step
+
+
+def run_benchmarks(depths=(1, 2, 3), quick=False):
+    open_boards, crowded = build_corpus()
+    positions = open_boards + crowded
+    full = [stuck_board(i) for i in range(len(crowded))]
+    min_time = 0.05 if quick else 0.2
+    game = Game2048(seed=0)
+    results = {}
+    for state in full:
+        game.state = state
+        assert game.is_game_over(), "stuck_board left a legal move"
+
+    # Warm the lazily filled row tables so the first benchmark is not penalised
+    for state in positions + full:
+        for direction in DIRECTIONS:
+            game.layout.move(state, direction)
+
+    for direction in DIRECTIONS:
+        results[f"move_{direction}"] = {
+            "value": rate(cycle(game, positions, lambda g: g.move(direction)), min_time),
+            "unit": "calls/s",
+        }
+    results["evaluate"] = {"value": rate(cycle(game, positions, lambda g: g.evaluate()), min_time), "unit": "calls/s"}
+    results["is_game_over_open"] = {
+        "value": rate(cycle(game, open_boards, lambda g: g.is_game_over()), min_time),
+        "unit": "calls/s",
+    }
+    results["is_game_over_crowded"] = {
+        "value": rate(cycle(game, crowded, lambda g: g.is_game_over()), min_time),
+        "unit": "calls/s",
+    }
+    results["is_game_over_full"] = {
+        "value": rate(cycle(game, full, lambda g: g.is_game_over()), min_time),
+        "unit": "calls/s",
+    }
+
+    # Latency per position is the fastest of a few cold-table searches, which
+    # keeps scheduler noise out of the percentiles
+    repeats = 1 if quick else 3
+    for depth in depths:
+        ai_game = Game2048(is_ai=True, ai_depth=depth, seed=0)
+        for kind, boards in (("open", open_boards), ("crowded", crowded)):
+            latencies = []
+            for state in boards:
+                best = float("inf")
+                for _ in range(repeats):
+                    ai_game.state = state
+                    if ai_game.search is not None:
+                        ai_game.search.table.clear()
+                    start = time.perf_counter()
+                    ai_game.get_best_move()
+                    best = min(best, time.perf_counter() - start)
+                latencies.append(best)
+            for pct in (50, 95, 99):
+                results[f"best_move_d{depth}_{kind}_p{pct}"] = {
+                    "value": float(np.percentile(latencies, pct)),
+                    "unit": "s",
+                }
+    return results
+
+
+def is_regression(name, value, baseline, threshold):
+    if baseline[name]["unit"] == "s":
+        return value > baseline[name]["value"] * (1 + threshold)
+    return value < baseline[name]["value"] * (1 - threshold)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Game2048 hot paths.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--depths", default="1,2,3", help="ai_depth values for get_best_move latency")
+    parser.add_argument("--quick", action="store_true", help="shorter timing runs")
+    args = parser.parse_args(argv)
+
+    depths = tuple(int(d) for d in args.depths.split(","))
+    results = run_benchmarks(depths, args.quick)
+
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    for name, result in results.items():
+        line = f"{name:<24}{result['value']:>14.6g} {result['unit']}"
+        if baseline and name in baseline:
+            change = result["value"] / baseline[name]["value"] - 1
+            line += f"  ({change:+.1%} vs baseline)"
+            if is_regression(name, result["value"], baseline, args.threshold):
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
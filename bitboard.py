@@ -0,0 +1,225 @@
+"""Packed board representation for the game engine.
+
+A board is a single Python int. Every cell holds the log2 exponent of its
+tile in a fixed-width bit field (0 = empty, 1 = 2, 2 = 4, ... 12 = 4096), and
+the grid sits inside a square frame whose side is the next power of two, so
+that row r starts at bit ``row_stride * r`` and cell (r, c) lives at bit
+``row_stride * r + cell_bits * c``. The padding columns and rows are always
+zero, which lets up/down moves reuse the row tables through a cheap bitwise
+transpose of the whole frame.
+
+A Layout holds the geometry and row tables of one board size and cell width.
+Boards up to 8x8 with tiles up to 32768 use 4-bit cells in an 8x8 (or 4x4)
+frame; wider boards get a 16x16 frame and bigger targets 5-bit cells. The
+module-level names are the default 7x7 layout used by the game.
+"""
+
+import threading
+from itertools import islice
+
+import numpy as np
+
+GRID_SIZE = 7
+ROW_TABLE_ENTRIES = 1 << 15  # rows kept per RowTable before the oldest are dropped
+
+
+class RowTable(dict):
+    """Row lookup table filled on first access.
+
+    A full table over every 28-bit row would need 2 ** 28 entries, so rows are
+    computed once when they first show up and served from the dict afterwards.
+    A long game keeps meeting new rows, so once the table holds ``max_entries``
+    the oldest quarter is dropped; rows still in use are recomputed on their
+    next miss. The game's main thread and the AI thread share the default
+    layout's tables, so rows are added and dropped under a lock; hits never
+    take it.
+    """
+
+    def __init__(self, compute, max_entries=ROW_TABLE_ENTRIES):
+        super().__init__()
+        self.compute = compute
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+
+    def __missing__(self, row):
+        value = self.compute(row)
+        with self.lock:
+            if len(self) >= self.max_entries:
+                # Dicts keep insertion order; evicting in batches keeps the scan for the oldest amortised O(1)
+                for old in list(islice(self, self.max_entries // 4 or 1)):
+                    del self[old]
+            self[row] = value
+        return value
+
+
+class Layout:
+    """Packed-board geometry and row tables for one board size and cell width."""
+
+    def __init__(self, size=GRID_SIZE, cell_bits=4):
+        self.size = size
+        self.cell_bits = cell_bits
+        self.frame = 1 << (size - 1).bit_length()  # power-of-two side, so transpose is log2(frame) swaps
+        self.row_stride = self.frame * cell_bits
+        self.row_mask = (1 << (size * cell_bits)) - 1
+        self.cell_mask = (1 << cell_bits) - 1
+        self.max_exponent = self.cell_mask  # largest exponent a cell holds; such tiles never merge
+        self.row_shifts = tuple(self.row_stride * r for r in range(size))
+        self.cell_shifts = tuple(self.row_stride * r + cell_bits * c for r in range(size) for c in range(size))
+
+        # Delta swaps that transpose the frame: swap 1x1 cells inside 2x2
+        # blocks, then 2x2 blocks inside 4x4 blocks, and so on up to quadrants.
+        steps = []
+        block = 1
+        while block < self.frame:
+            steps.append((block * (self.row_stride - cell_bits),
+                          self._frame_mask(lambda r, c, b=block: r % (2 * b) < b <= c % (2 * b))))
+            block *= 2
+        self.transpose_steps = tuple(steps)
+
+        self.reverse = RowTable(self._reverse_row)
+        self.left = RowTable(self._slide_left)
+        self.right = RowTable(lambda row: self.reverse[self.left[self.reverse[row]]])
+        # True for a row with an empty cell or two equal neighbours, i.e. one that is not stuck
+        self.slidable = RowTable(self._slidable)
+        self.empty = tuple(self._empty_row(r) for r in range(size))
+        self.moves = {
+            "up": self.move_up,
+            "down": self.move_down,
+            "left": self.move_left,
+            "right": self.move_right,
+        }
+
+    def __repr__(self):
+        return f"Layout(size={self.size}, cell_bits={self.cell_bits})"
+
+    def __reduce__(self):
+        # Row tables hold closures; pickle as a reference to the shared layout instead
+        return _shared_layout, (self.size, self.cell_bits)
+
+    def _frame_mask(self, select):
+        mask = 0
+        for r in range(self.frame):
+            for c in range(self.frame):
+                if select(r, c):
+                    mask |= self.cell_mask << (self.row_stride * r + self.cell_bits * c)
+        return mask
+
+    def row_cells(self, row):
+        return [(row >> (self.cell_bits * c)) & self.cell_mask for c in range(self.size)]
+
+    def pack_row(self, cells):
+        row = 0
+        for c, exponent in enumerate(cells):
+            row |= exponent << (self.cell_bits * c)
+        return row
+
+    def _slide_left(self, row):
+        non_zero = [e for e in self.row_cells(row) if e]
+        merged = []
+        i = 0
+        while i < len(non_zero):
+            if i + 1 < len(non_zero) and non_zero[i] == non_zero[i + 1] and non_zero[i] < self.max_exponent:
+                merged.append(non_zero[i] + 1)
+                i += 2
+            else:
+                merged.append(non_zero[i])
+                i += 1
+        return self.pack_row(merged + [0] * (self.size - len(merged)))
+
+    def _reverse_row(self, row):
+        return self.pack_row(self.row_cells(row)[::-1])
+
+    def _slidable(self, row):
+        cells = self.row_cells(row)
+        return 0 in cells or any(a == b and a < self.max_exponent for a, b in zip(cells, cells[1:]))
+
+    def _empty_row(self, r):
+        base = self.row_shifts[r]
+        return RowTable(lambda row: tuple(base + self.cell_bits * c for c, e in enumerate(self.row_cells(row)) if not e))
+
+    def transpose(self, board):
+        for shift, mask in self.transpose_steps:
+            t = ((board >> shift) ^ board) & mask
+            board ^= t ^ (t << shift)
+        return board
+
+    def _apply(self, board, table):
+        row_mask = self.row_mask
+        out = 0
+        for shift in self.row_shifts:
+            out |= table[(board >> shift) & row_mask] << shift
+        return out
+
+    def move_left(self, board):
+        return self._apply(board, self.left)
+
+    def move_right(self, board):
+        return self._apply(board, self.right)
+
+    def move_up(self, board):
+        return self.transpose(self._apply(self.transpose(board), self.left))
+
+    def move_down(self, board):
+        return self.transpose(self._apply(self.transpose(board), self.right))
+
+    def move(self, board, direction):
+        return self.moves[direction](board)
+
+    def can_move(self, board):
+        """True unless the board is full with no two equal neighbours."""
+        slidable, row_mask = self.slidable, self.row_mask
+        for shift in self.row_shifts:
+            if slidable[(board >> shift) & row_mask]:
+                return True
+        columns = self.transpose(board)
+        for shift in self.row_shifts:
+            if slidable[(columns >> shift) & row_mask]:
+                return True
+        return False
+
+    def empty_cells(self, board):
+        """Bit offsets of the empty cells in row-major order."""
+        row_mask = self.row_mask
+        cells = []
+        for table, shift in zip(self.empty, self.row_shifts):
+            cells += table[(board >> shift) & row_mask]
+        return cells
+
+    def get_exponent(self, board, i, j):
+        return (board >> (self.row_stride * i + self.cell_bits * j)) & self.cell_mask
+
+    # Array conversion goes through the frame's bits in NumPy, so its cost
+    # stays flat as boards get wider instead of growing with the cell count
+    def from_array(self, array):
+        array = np.asarray(array)
+        exponents = np.zeros((self.frame, self.frame), dtype=np.uint8)
+        tiles = array > 0
+        exponents[:self.size, :self.size][tiles] = np.log2(array[tiles]).astype(np.uint8)
+        bits = (exponents[:, :, None] >> np.arange(self.cell_bits, dtype=np.uint8)) & 1
+        return int.from_bytes(np.packbits(bits.ravel(), bitorder="little").tobytes(), "little")
+
+    def to_array(self, board):
+        nbits = self.frame * self.frame * self.cell_bits
+        raw = np.frombuffer(board.to_bytes(-(-nbits // 8), "little"), dtype=np.uint8)
+        bits = np.unpackbits(raw, bitorder="little")[:nbits].reshape(self.frame, self.frame, self.cell_bits)
+        exponents = (bits[:self.size, :self.size] << np.arange(self.cell_bits, dtype=np.uint8)).sum(axis=2, dtype=int)
+        return np.where(exponents > 0, np.left_shift(1, exponents), 0)
+
+
+_layouts = {}
+
+
+def _shared_layout(size, cell_bits):
+    key = (size, cell_bits)
+    if key not in _layouts:
+        _layouts[key] = Layout(size, cell_bits)
+    return _layouts[key]
+
+
+def get_layout(size=GRID_SIZE, max_tile=4096):
+    """Shared Layout for ``size`` x ``size`` boards played up to ``max_tile``."""
+    return _shared_layout(size, max(4, (max_tile.bit_length() - 1).bit_length()))
+
+
+DEFAULT = get_layout()
+CELL_SHIFTS = DEFAULT.cell_shifts
@@ -0,0 +1,275 @@
+"""Opening book: a persistent cache of searched positions.
+
+Positions are stored under the Zobrist key of their canonical form, the
+smallest of the board's 8 rotations and reflections, so symmetric positions
+share one entry. Moves are stored in the canonical frame and mapped back to
+the caller's board on lookup.
+
+The book file is a sorted array of fixed-size records (key, depth, move,
+value) that is memory-mapped and binary-searched, so opening a large book
+costs nothing up front. Lookups and results added at runtime are kept in a
+bounded in-memory LRU.
+
+A book searched with tuned evaluator weights XORs every key with the
+weights' fingerprint, so its entries only answer searches that use the same
+weights, and books of the built-in heuristic only answer searches without
+them. Books for different evaluators can be merged into one file.
+
+    python book.py build --games 50 --depth 3 --plies 40 --out book.bin
+    python book.py build --weights weights.npz --out book.bin
+    python book.py merge book.bin more.bin --out book.bin
+    python book.py info book.bin
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+from collections import OrderedDict
+from itertools import combinations
+
+import numpy as np
+
+import bitboard
+from evaluator import Weights, tuned_terms
+from expectimax import ExpectimaxSearch, zobrist, zobrist_keys
+from game import Game2048
+
+DIRECTIONS = ("up", "down", "left", "right")
+DEFAULT_PATH = "book.bin"
+RECORD = np.dtype([("key", "<u8"), ("depth", "u1"), ("move", "u1"), ("value", "<f4")])
+
+
+def _mirror(board, layout):
+    """Reverse every row (left <-> right)."""
+    out = 0
+    for shift in layout.row_shifts:
+        out |= layout.reverse[(board >> shift) & layout.row_mask] << shift
+    return out
+
+
+def _flip(board, layout):
+    """Reverse the row order (up <-> down)."""
+    out = 0
+    for shift, target in zip(layout.row_shifts, reversed(layout.row_shifts)):
+        out |= ((board >> shift) & layout.row_mask) << target
+    return out
+
+
+def _direction_map(transposed, mirrored, flipped):
+    mapping = {d: d for d in DIRECTIONS}
+    swaps = []
+    if transposed:
+        swaps.append({"up": "left", "left": "up", "down": "right", "right": "down"})
+    if mirrored:
+        swaps.append({"left": "right", "right": "left"})
+    if flipped:
+        swaps.append({"up": "down", "down": "up"})
+    for swap in swaps:
+        mapping = {d: swap.get(m, m) for d, m in mapping.items()}
+    return mapping
+
+
+# The 8 symmetries as (transposed, mirrored, flipped, direction map into the transformed board)
+SYMMETRIES = tuple(
+    (t, m, f, _direction_map(t, m, f)) for t in (False, True) for m in (False, True) for f in (False, True)
+)
+
+
+def canonical(board, layout=bitboard.DEFAULT):
+    """Return (canonical board, map from directions on ``board`` to directions on it)."""
+    best, best_map = None, None
+    for transposed, mirrored, flipped, mapping in SYMMETRIES:
+        image = layout.transpose(board) if transposed else board
+        if mirrored:
+            image = _mirror(image, layout)
+        if flipped:
+            image = _flip(image, layout)
+        if best is None or image < best:
+            best, best_map = image, mapping
+    return best, best_map
+
+
+def key_salt(weights):
+    """What keys searched with evaluator ``weights`` are XORed with; 0 for the built-in heuristic."""
+    return 0 if weights is None else weights.fingerprint()
+
+
+class OpeningBook:
+    """Book for boards of one bitboard.Layout and one evaluator; keys from other layouts never match.
+
+    ``weights`` are the evaluator.Weights of the searches the book serves,
+    or None for the built-in heuristic.
+    """
+
+    def __init__(self, path=None, cache_size=1 << 16, layout=bitboard.DEFAULT, weights=None):
+        self.layout = layout
+        self.zobrist = zobrist_keys(layout).key
+        self.salt = key_salt(weights)
+        if path is not None and os.path.exists(path) and os.path.getsize(path):
+            self.records = np.memmap(path, dtype=RECORD, mode="r")
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+        self.keys = self.records["key"]
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # key -> (depth, move index, value) of the deepest known entry, or None
+        self.stats = {"hits": 0, "misses": 0}
+
+    def __len__(self):
+        return len(self.records)
+
+    def _entry(self, key):
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        entry = None
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        # Records are sorted by key then depth, so the last match is the deepest
+        while i < len(self.records) and int(self.keys[i]) == key:
+            record = self.records[i]
+            entry = (int(record["depth"]), int(record["move"]), float(record["value"]))
+            i += 1
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        self.cache[key] = entry
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def get(self, board, depth):
+        """Return (direction, value) from a search of at least ``depth``, or None."""
+        image, mapping = canonical(board, self.layout)
+        entry = self._entry(self.zobrist(image) ^ self.salt)
+        if entry is not None and entry[0] >= depth:
+            canonical_move = DIRECTIONS[entry[1]]
+            direction = next(d for d, m in mapping.items() if m == canonical_move)
+            if self.layout.move(board, direction) != board:  # guards against a key collision
+                self.stats["hits"] += 1
+                return direction, entry[2]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, board, depth, direction, value):
+        """Remember a search result in memory; it is not written to the book file."""
+        image, mapping = canonical(board, self.layout)
+        key = self.zobrist(image) ^ self.salt
+        entry = self._entry(key)
+        if entry is None or entry[0] <= depth:
+            self._remember(key, (depth, DIRECTIONS.index(mapping[direction]), value))
+
+
+def write_book(path, records):
+    """Sort ``records`` by key and depth, keep one per (key, depth) and write them to ``path``."""
+    records = records[np.lexsort((records["depth"], records["key"]))]
+    if len(records):
+        last = np.ones(len(records), dtype=bool)
+        last[:-1] = (records["key"][1:] != records["key"][:-1]) | (records["depth"][1:] != records["depth"][:-1])
+        records = records[last]
+    tmp = path + ".tmp"
+    records.tofile(tmp)
+    os.replace(tmp, path)  # the old file may still be mapped by readers
+    return len(records)
+
+
+def read_book(path):
+    return np.fromfile(path, dtype=RECORD)
+
+
+def starting_positions():
+    """Canonical forms of every two-tile starting board."""
+    boards = set()
+    for a, b in combinations(bitboard.CELL_SHIFTS, 2):
+        for ea in (1, 2):
+            for eb in (1, 2):
+                boards.add(canonical(ea << a | eb << b)[0])
+    return sorted(boards)
+
+
+def _search(job):
+    """Search ``positions`` (and, for a seeded game, its first ``plies`` moves) at ``depth``."""
+    positions, seed, plies, depth, weights = job
+    search = ExpectimaxSearch(max_depth=depth,
+                              terms=None if weights is None else tuned_terms(bitboard.DEFAULT, weights))
+    salt = key_salt(weights)
+    rows = []
+
+    def record(board):
+        direction, value = search.best_move(board)
+        if direction is not None:
+            image, mapping = canonical(board)
+            rows.append((zobrist(image) ^ salt, depth, DIRECTIONS.index(mapping[direction]), value))
+        return direction
+
+    for board in positions:
+        record(board)
+    if seed is not None:
+        game = Game2048(is_ai=True, ai_depth=depth, seed=seed)
+        while game.move_count < plies:
+            direction = record(game.state)
+            if direction is None:
+                break
+            game.move(direction)
+    return np.array(rows, dtype=RECORD)
+
+
+def build(games=50, seed=0, depth=3, plies=40, starts=True, workers=None, weights=None):
+    """Records for every starting position and the first ``plies`` moves of seeded self-play games.
+
+    Positions are searched with evaluator ``weights``, or with the built-in
+    heuristic when they are None.
+    """
+    jobs = [((), seed + i, plies, depth, weights) for i in range(games)]
+    if starts:
+        positions = starting_positions()
+        chunk = -(-len(positions) // max(1, workers or os.cpu_count() or 1))
+        jobs += [(positions[i:i + chunk], None, 0, depth, weights) for i in range(0, len(positions), chunk)]
+    with multiprocessing.Pool(processes=workers) as pool:
+        parts = pool.map(_search, jobs)
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=RECORD)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build, merge and inspect opening books.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="search positions and write them to a book")
+    build_parser.add_argument("--games", type=int, default=50, help="seeded self-play games to take openings from")
+    build_parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    build_parser.add_argument("--depth", type=int, default=3)
+    build_parser.add_argument("--plies", type=int, default=40, help="opening moves recorded per game")
+    build_parser.add_argument("--no-starts", action="store_true", help="skip the two-tile starting positions")
+    build_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    build_parser.add_argument("--weights", default=None,
+                              help="search with these evaluator.py weights (default: the built-in heuristic)")
+    build_parser.add_argument("--out", default=DEFAULT_PATH)
+
+    merge_parser = commands.add_parser("merge", help="combine books into one")
+    merge_parser.add_argument("paths", nargs="+")
+    merge_parser.add_argument("--out", default=DEFAULT_PATH)
+
+    info_parser = commands.add_parser("info", help="summarise a book")
+    info_parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        weights = None if args.weights is None else Weights.load(args.weights)
+        records = build(args.games, args.seed, args.depth, args.plies, not args.no_starts, args.workers, weights)
+        if os.path.exists(args.out):
+            records = np.concatenate([read_book(args.out), records])
+        print(f"Wrote {write_book(args.out, records)} positions to {args.out}")
+    elif args.command == "merge":
+        records = np.concatenate([read_book(path) for path in args.paths])
+        print(f"Wrote {write_book(args.out, records)} positions to {args.out}")
+    else:
+        records = read_book(args.path)
+        depths, counts = np.unique(records["depth"], return_counts=True)
+        print(f"{args.path}: {len(records)} positions, {records.nbytes} bytes")
+        for depth, count in zip(depths, counts):
+            print(f"  depth {depth}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
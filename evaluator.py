@@ -0,0 +1,304 @@
+"""Tuned board evaluation with weights learned from self-play.
+
+The tuned evaluator scores a board as a sum over its lines (every row and
+every column) plus a weight times the largest exponent. A line's value comes
+from its log2 exponents:
+
+    features  empty cells, merge pairs, monotonicity, smoothness, and a
+              corner bonus when the line's largest tile sits at one end
+    n-tuples  one table entry per window of ``tuple_length`` adjacent cells,
+              with the table shared by all windows of all lines
+
+Both parts are linear in the weights. They are learned with TD(0) on
+afterstates over a batch of self-play games stepped together with batch.py.
+The learned value is the expected number of moves the game still lasts, so
+leaves at the same search depth stay comparable without carrying a score
+along the path.
+
+TunedTerms has the interface of heuristic.LineTerms, so ExpectimaxSearch and
+HeuristicState use it as is. A line's value is computed once and kept in a
+RowTable, so a leaf costs one lookup per row and column.
+
+    python evaluator.py train --steps 20000 --games 64 --gamma 0.995 --out weights.npz
+    python evaluator.py info weights.npz
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import batch
+import bitboard
+import heuristic
+from bitboard import RowTable
+
+FEATURES = ("empty", "merges", "monotonicity", "smoothness", "corner")
+DEFAULT_PATH = "weights.npz"
+TUPLE_BASE = 16  # exponents past 15 share the last tuple index
+
+
+def line_features(lines):
+    """Feature values, shape (M, len(FEATURES)), of an (M, n) array of exponents."""
+    lines = np.asarray(lines, dtype=np.int64)
+    empty = np.count_nonzero(lines == 0, axis=1)
+    # The tiles in order with the gaps closed, as a slide would leave them
+    packed = np.take_along_axis(lines, np.argsort(lines == 0, axis=1, kind="stable"), axis=1)
+    neighbours = (packed[:, 1:] != 0) & (packed[:, :-1] != 0)
+    steps = np.diff(packed, axis=1) * neighbours
+    merges = np.count_nonzero(neighbours & (steps == 0), axis=1)
+    monotonicity = -np.minimum(np.maximum(steps, 0).sum(axis=1), np.maximum(-steps, 0).sum(axis=1))
+    smoothness = -np.abs(steps).sum(axis=1)
+    top = lines.max(axis=1)
+    corner = np.where((lines[:, 0] == top) | (lines[:, -1] == top), top, 0)
+    return np.stack([empty, merges, monotonicity, smoothness, corner], axis=1).astype(np.float64)
+
+
+def tuple_indices(lines, length):
+    """Table index of every window of ``length`` adjacent cells, shape (M, n - length + 1)."""
+    lines = np.asarray(lines, dtype=np.int64)
+    if not length or lines.shape[1] < length:
+        return np.zeros((len(lines), 0), dtype=np.int64)
+    windows = sliding_window_view(np.minimum(lines, TUPLE_BASE - 1), length, axis=1)
+    return windows @ TUPLE_BASE ** np.arange(length)
+
+
+def board_lines(exponents):
+    """Rows then columns of an (N, n, n) stack of exponent boards, shape (N, 2n, n)."""
+    return np.concatenate([exponents, exponents.transpose(0, 2, 1)], axis=1)
+
+
+def exponents_of(boards):
+    """Exponent boards of an array of tile values, as in Game2048.board."""
+    return np.log2(np.maximum(boards, 1)).astype(np.int64)
+
+
+class Weights:
+    """Weights of the tuned evaluator: one per feature, the largest-tile weight and the n-tuple table."""
+
+    def __init__(self, features=None, max_weight=0.0, tuples=None, tuple_length=4):
+        self.features = np.zeros(len(FEATURES)) if features is None else np.array(features, dtype=np.float64)
+        self.max_weight = float(max_weight)
+        self.tuple_length = tuple_length
+        if tuples is None:
+            tuples = np.zeros(TUPLE_BASE ** tuple_length, dtype=np.float32)
+        self.tuples = np.array(tuples, dtype=np.float32)
+
+    def line_values(self, lines):
+        """Value of each line of an (M, n) array of exponents."""
+        values = line_features(lines) @ self.features
+        indices = tuple_indices(lines, self.tuple_length)
+        if indices.size:
+            values += self.tuples[indices].sum(axis=1)
+        return values
+
+    def board_values(self, exponents):
+        """Value of each board of an (N, n, n) stack of exponent boards; matches TunedTerms.evaluate."""
+        n = exponents.shape[-1]
+        lines = board_lines(exponents).reshape(-1, n)
+        values = self.line_values(lines).reshape(len(exponents), -1).sum(axis=1)
+        return values + self.max_weight * exponents.max(axis=(1, 2))
+
+    def fingerprint(self):
+        """64-bit digest of the weights, which book.py mixes into its keys."""
+        digest = hashlib.blake2b(digest_size=8)
+        for part in (self.features, np.float64(self.max_weight), np.int64(self.tuple_length), self.tuples):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        return int.from_bytes(digest.digest(), "little")
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, names=np.array(FEATURES), features=self.features, max_weight=self.max_weight,
+                     tuples=self.tuples, tuple_length=self.tuple_length)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if tuple(data["names"]) != FEATURES:
+                raise ValueError("%s has features %s, expected %s" % (path, tuple(data["names"]), FEATURES))
+            return cls(data["features"], float(data["max_weight"]), data["tuples"], int(data["tuple_length"]))
+
+
+def load_weights(path):
+    """Weights saved at ``path``, or None if there is no such file."""
+    if path is None or not os.path.exists(path):
+        return None
+    return Weights.load(path)
+
+
+class TunedTerms(heuristic.LineTerms):
+    """heuristic.LineTerms with line values from ``weights``; rows and columns share one table."""
+
+    def __init__(self, layout, weights):
+        super().__init__(layout)
+        self.weights = weights
+        self.max_weight = weights.max_weight
+        self.row_term = self.col_term = RowTable(self._line_value)
+        self.row_max = RowTable(lambda row: max(layout.row_cells(row)))
+        self.tile_values = tuple(range(layout.max_exponent + 1))
+        # Plain Python copies for _line_value, which runs once per new line seen in a search
+        self.feature_weights = weights.features.tolist()
+        self.tuple_weights = weights.tuples.tolist()
+        self.windows = range(layout.size - weights.tuple_length + 1) if weights.tuple_length else range(0)
+        self.places = tuple(TUPLE_BASE ** i for i in range(weights.tuple_length))
+
+    def __reduce__(self):
+        return tuned_terms, (self.layout, self.weights)
+
+    def _line_value(self, row):
+        """Weights.line_values of one line, without the cost of NumPy on a single row."""
+        cells = self.layout.row_cells(row)
+        tiles = [e for e in cells if e]
+        steps = [b - a for a, b in zip(tiles, tiles[1:])]
+        top = max(cells)
+        features = (
+            len(cells) - len(tiles),
+            steps.count(0),
+            -min(sum(s for s in steps if s > 0), -sum(s for s in steps if s < 0)),
+            -sum(map(abs, steps)),
+            top if cells[0] == top or cells[-1] == top else 0,
+        )
+        value = sum(w * f for w, f in zip(self.feature_weights, features))
+        clipped = [min(e, TUPLE_BASE - 1) for e in cells]
+        for i in self.windows:
+            value += self.tuple_weights[sum(e * place for e, place in zip(clipped[i:], self.places))]
+        return value
+
+
+_tuned_terms = {}
+
+
+def tuned_terms(layout, weights):
+    """Shared TunedTerms for ``layout`` and ``weights``."""
+    key = (layout, id(weights))
+    if key not in _tuned_terms:
+        _tuned_terms[key] = TunedTerms(layout, weights)
+    return _tuned_terms[key]
+
+
+def _spawn(rng, boards):
+    """Add a 2 (90%) or 4 to a random empty cell of every board that has one, in place."""
+    flat = boards.reshape(len(boards), -1)
+    empty = flat == 0
+    cells = (rng.random(flat.shape) * empty).argmax(axis=1)
+    rows = np.flatnonzero(empty.any(axis=1))
+    flat[rows, cells[rows]] = np.where(rng.random(len(rows)) < 0.9, 2, 4)
+
+
+def _new_boards(rng, games, size):
+    boards = np.zeros((games, size, size), dtype=np.int64)
+    _spawn(rng, boards)
+    _spawn(rng, boards)
+    return boards
+
+
+def _td_update(weights, exponents, errors, alpha):
+    """Move the values of ``exponents`` towards their targets by ``alpha`` times ``errors``."""
+    n = exponents.shape[-1]
+    lines = board_lines(exponents).reshape(-1, n)
+    per_line = np.repeat(errors, 2 * n)
+    # Share the step among every weight a board touches, so alpha is independent of the board size
+    indices = tuple_indices(lines, weights.tuple_length)
+    step = alpha / (2 * n * (len(FEATURES) + indices.shape[1]) + 1)
+    features = line_features(lines)
+    scale = np.abs(features).max(axis=0) + 1  # features span different ranges
+    weights.features += step * (features * per_line[:, None]).sum(axis=0) / scale / len(errors)
+    weights.max_weight += step * (errors * exponents.max(axis=(1, 2))).sum() / len(errors)
+    if indices.size:
+        np.add.at(weights.tuples, indices, (step * per_line)[:, None].astype(np.float32))
+
+
+def train(steps=20000, games=64, size=bitboard.GRID_SIZE, alpha=0.1, gamma=1.0, seed=0, weights=None,
+          log_interval=None):
+    """Learn weights with TD(0) over ``games`` self-play games played together for ``steps`` moves each.
+
+    Every game plays the move whose afterstate scores best and starts over
+    when it is stuck. ``gamma`` discounts moves further ahead. Returns
+    (weights, list of finished game lengths).
+    """
+    rng = np.random.default_rng(seed)
+    weights = Weights() if weights is None else weights
+    boards = _new_boards(rng, games, size)
+    previous = np.zeros((games, size, size), dtype=np.int64)  # each game's last afterstate, as exponents
+    has_previous = np.zeros(games, dtype=bool)
+    moves = np.zeros(games, dtype=np.int64)
+    lengths = []
+    index = np.arange(games)
+    start = time.perf_counter()
+    for step in range(steps):
+        after, moved, _ = batch.move_boards(boards)
+        after_exponents = exponents_of(after)
+        values = weights.board_values(after_exponents.reshape(-1, size, size)).reshape(4, games)
+        values[~moved] = -np.inf
+        best = values.argmax(axis=0)
+        alive = moved.any(axis=0)
+
+        # Each move earns 1, and a stuck game is worth nothing more
+        targets = np.where(alive, 1 + gamma * values[best, index], 0.0)
+        if has_previous.any():
+            errors = targets[has_previous] - weights.board_values(previous[has_previous])
+            _td_update(weights, previous[has_previous], errors, alpha)
+
+        previous[alive] = after_exponents[best, index][alive]
+        has_previous = alive
+        survivors = after[best, index][alive]
+        _spawn(rng, survivors)
+        boards[alive] = survivors
+        moves += alive
+        if not alive.all():
+            lengths += moves[~alive].tolist()
+            moves[~alive] = 0
+            boards[~alive] = _new_boards(rng, np.count_nonzero(~alive), size)
+        if log_interval and (step + 1) % log_interval == 0:
+            recent = lengths[-games:]
+            print(f"step {step + 1}: {len(lengths)} games, mean length of the last {len(recent)} "
+                  f"{np.mean(recent) if recent else float('nan'):.0f}, {time.perf_counter() - start:.0f}s")
+    return weights, lengths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and inspect weights for the tuned evaluator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="learn weights from self-play")
+    train_parser.add_argument("--steps", type=int, default=20000, help="moves played by each game slot")
+    train_parser.add_argument("--games", type=int, default=64, help="games played side by side")
+    train_parser.add_argument("--size", type=int, default=bitboard.GRID_SIZE, help="board side length")
+    train_parser.add_argument("--alpha", type=float, default=0.1, help="learning rate")
+    train_parser.add_argument("--gamma", type=float, default=1.0,
+                              help="discount per move; below 1 helps when games outlast the run, as on 7x7")
+    train_parser.add_argument("--tuple-length", type=int, default=4, help="cells per n-tuple window, 0 for none")
+    train_parser.add_argument("--seed", type=int, default=0)
+    train_parser.add_argument("--resume", action="store_true", help="start from the weights already in --out")
+    train_parser.add_argument("--out", default=DEFAULT_PATH)
+
+    info_parser = commands.add_parser("info", help="summarise a weights file")
+    info_parser.add_argument("path", nargs="?", default=DEFAULT_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == "train":
+        weights = load_weights(args.out) if args.resume else None
+        if weights is None:
+            weights = Weights(tuple_length=args.tuple_length)
+        weights, lengths = train(args.steps, args.games, args.size, args.alpha, args.gamma, args.seed, weights,
+                                 log_interval=max(1, args.steps // 20))
+        weights.save(args.out)
+        print(f"Wrote {args.out} after {len(lengths)} games")
+    else:
+        weights = Weights.load(args.path)
+        for name, value in zip(FEATURES, weights.features):
+            print(f"  {name:<13}{value:10.4f}")
+        print(f"  {'max tile':<13}{weights.max_weight:10.4f}")
+        used = np.count_nonzero(weights.tuples)
+        print(f"  {weights.tuple_length}-tuples: {used} of {len(weights.tuples)} entries set")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Expectimax search over packed boards.
+
+Max nodes pick the best of the four slides; chance nodes average over a 2
+(p = 0.9) or a 4 (p = 0.1) spawning in the empty cells. With more than
+``spawn_samples`` empty cells only an evenly spaced subset is expanded,
+starting at the first empty cell in row-major order, each sampled cell
+standing in for its share of the rest. Chance nodes one ply above the leaves
+are cached by board, and the cache is kept across moves. Branches whose
+probability of being reached falls below ``prob_cutoff`` are scored with the
+heuristic instead of being expanded, and results are shared between
+transposed move orders through a bounded, Zobrist-keyed transposition table.
+"""
+
+import random
+import time
+from collections import OrderedDict
+
+import bitboard
+import heuristic
+
+DIRECTIONS = ("up", "down", "left", "right")
+SPAWNS = ((1, 0.9), (2, 0.1))  # (exponent, probability)
+
+
+class ZobristKeys:
+    """Random 64-bit keys per (cell, exponent) of one bitboard.Layout, with per-row tables."""
+
+    def __init__(self, layout):
+        rng = random.Random(4096)
+        self.layout = layout
+        self.cell = {shift: tuple(rng.getrandbits(64) for _ in range(layout.max_exponent + 1))
+                     for shift in layout.cell_shifts}
+        # Key change for placing each exponent in an empty cell: XOR out the empty key, XOR in the tile
+        self.spawn = {shift: tuple(keys[0] ^ key for key in keys) for shift, keys in self.cell.items()}
+        self.rows = tuple(self._row_table(r) for r in range(layout.size))
+
+    def _row_table(self, r):
+        layout = self.layout
+
+        def compute(row):
+            key = 0
+            for c, exponent in enumerate(layout.row_cells(row)):
+                key ^= self.cell[layout.row_shifts[r] + layout.cell_bits * c][exponent]
+            return key
+        return bitboard.RowTable(compute)
+
+    def key(self, board):
+        row_mask = self.layout.row_mask
+        key = 0
+        for table, shift in zip(self.rows, self.layout.row_shifts):
+            key ^= table[(board >> shift) & row_mask]
+        return key
+
+
+_zobrist_keys = {}
+
+
+def zobrist_keys(layout):
+    """Shared ZobristKeys for ``layout``."""
+    if layout not in _zobrist_keys:
+        _zobrist_keys[layout] = ZobristKeys(layout)
+    return _zobrist_keys[layout]
+
+
+zobrist = zobrist_keys(bitboard.DEFAULT).key
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    """Bounded map from Zobrist key to (board, depth, value).
+
+    An entry is only replaced by a search of equal or greater depth, and once
+    the table is full the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries=1 << 18):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, board, depth):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != board or entry[1] < depth:
+            return None
+        self.entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, key, board, depth, value):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == board and entry[1] > depth:
+            return
+        self.entries[key] = (board, depth, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class ExpectimaxSearch:
+    def __init__(self, max_depth=3, prob_cutoff=1e-3, spawn_samples=4, time_budget=None, table_size=1 << 18,
+                 layout=bitboard.DEFAULT, terms=None):
+        self.max_depth = max_depth
+        self.prob_cutoff = prob_cutoff
+        self.spawn_samples = spawn_samples  # empty cells averaged per chance node
+        self.time_budget = time_budget  # seconds per best_move call, None for no limit
+        self.table = TranspositionTable(table_size)
+        # Averages of leaf chance nodes by board; they depend on nothing else, so they stay valid between moves
+        self.leaf_values = {}
+        self.layout = layout
+        # Leaf evaluation: heuristic.LineTerms or a subclass such as evaluator.TunedTerms
+        self.terms = heuristic.line_terms(layout) if terms is None else terms
+        self.keys = zobrist_keys(layout)
+        self.evaluate = self.terms.evaluate
+        # Bound once, the inner loops run for every node
+        self._moves = tuple(layout.moves.values())
+        self._empty_cells = layout.empty_cells
+        self.should_stop = None  # optional callable, returns True to abandon the current depth
+        self.book = None  # optional book.OpeningBook consulted before searching
+        self.book_depth = None  # shallowest book entry to accept, None for max_depth
+        self.stats = {}
+        self._deadline = None
+        self._interruptible = False
+
+    def best_move(self, board):
+        """Return (direction, value) for the best slide, or (None, value) if none moves."""
+        self.stats = {"nodes": 0, "tt_hits": 0, "depth": 0}
+        self._interruptible = False
+        if not self.layout.can_move(board):
+            return None, self.evaluate(board)
+        if self.book is not None:
+            cached = self.book.get(board, self.max_depth if self.book_depth is None else self.book_depth)
+            if cached is not None:
+                self.stats["book_hit"] = True
+                return cached
+        if self.time_budget is None and self.should_stop is None:
+            result = self._root(board, self.max_depth)
+        else:
+            # Iterative deepening: keep the deepest search that finished in time.
+            # Depth 1 always runs to completion so there is a move to return.
+            self._deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+            result = self._root(board, 1)
+            self._interruptible = True
+            for depth in range(2, self.max_depth + 1):
+                try:
+                    result = self._root(board, depth)
+                except SearchTimeout:
+                    break
+        if self.book is not None:
+            self.book.put(board, self.stats["depth"], *result)
+        return result
+
+    def _stopped(self):
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            return True
+        return self.should_stop is not None and self.should_stop()
+
+    def _root(self, board, depth):
+        best_move, best_value = None, -float('inf')
+        for direction in DIRECTIONS:
+            child = self.layout.move(board, direction)
+            if child != board:
+                value = self._chance(child, depth, 1.0)
+                if value > best_value:
+                    best_move, best_value = direction, value
+        self.stats["depth"] = depth
+        if best_move is None:
+            return None, self.evaluate(board)
+        return best_move, best_value
+
+    def _max(self, board, key, depth, prob):
+        if depth == 0:
+            return self.evaluate(board)
+        cached = self.table.get(key, board, depth)
+        if cached is not None:
+            self.stats["tt_hits"] += 1
+            return cached
+
+        best = None
+        for move in self._moves:
+            child = move(board)
+            if child != board:
+                value = self._chance(child, depth, prob)
+                if best is None or value > best:
+                    best = value
+        if best is None:  # no legal move, the game is over
+            best = self.evaluate(board)
+        self.table.put(key, board, depth, best)
+        return best
+
+    def _chance(self, board, depth, prob):
+        stats = self.stats
+        stats["nodes"] += 1
+        if self._interruptible and not stats["nodes"] & 255 and self._stopped():
+            raise SearchTimeout()
+
+        if prob < self.prob_cutoff:
+            return self.evaluate(board)
+        if depth == 1:
+            value = self.leaf_values.get(board)
+            if value is not None:
+                return value
+        empty_cells = self._empty_cells(board)
+        if not empty_cells:
+            return self.evaluate(board)
+
+        # Average over an evenly spaced sample of the empty cells on open boards
+        n = len(empty_cells)
+        if n > self.spawn_samples:
+            empty_cells = empty_cells[::-(-n // self.spawn_samples)]
+
+        if depth == 1:
+            # The children are leaves: score each spawn from this board's line terms in O(1)
+            value = heuristic.HeuristicState(board, terms=self.terms).spawn_total(empty_cells, SPAWNS) / len(empty_cells)
+            if len(self.leaf_values) >= self.table.max_entries:
+                self.leaf_values.clear()
+            self.leaf_values[board] = value
+            return value
+
+        # Each sampled cell stands in for n / len(empty_cells) of them
+        total = 0.0
+        spawn_keys = self.keys.spawn
+        key = self.keys.key(board)
+        for exponent, p in SPAWNS:
+            child_prob = prob * p / len(empty_cells)
+            for shift in empty_cells:
+                child_key = key ^ spawn_keys[shift][exponent]
+                total += p * self._max(board | exponent << shift, child_key, depth - 1, child_prob)
+        return total / len(empty_cells)
@@ -0,0 +1,160 @@
+"""Game engine without any pygame dependency.
+
+Main.py renders Game2048 instances; headless.py and the other tools import
+this module directly so they can run without a display.
+"""
+
+import random
+import time
+
+import numpy as np
+
+import batch
+import bitboard
+import evaluator
+import heuristic
+from expectimax import ExpectimaxSearch
+
+
+class Game2048:
+    def __init__(self, is_ai=False, max_tile=4096, ai_depth=3, ai_time_budget=None, seed=None, state=None,
+                 size=bitboard.GRID_SIZE):
+        self.size = size
+        self.layout = bitboard.get_layout(size, max_tile)  # packed-board geometry and row tables for this size
+        self.state = 0  # packed board, see bitboard.py
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self.rng = random.Random(seed)  # per-game RNG so seeded games replay exactly
+        self.recorder = None  # set by replay.Replay.start
+        self.book = None  # optional book.OpeningBook for get_best_move, opened with the same weights
+        self.profiler = None  # optional profiler.Profiler, given the stats of every search
+        self.weights = None  # optional evaluator.Weights; None scores boards with heuristic.py's formula
+        self.max_tile = max_tile
+        self.ai_depth = ai_depth
+        self.ai_time_budget = ai_time_budget
+        self.search = None
+        if state is None:
+            self.add_random_tile()
+            self.add_random_tile()
+        else:
+            self.state = state  # start from a given board, no random tiles
+        self.is_ai = is_ai
+        self.move_count = 0
+
+    def copy(self):
+        """Independent copy with the same board, move count and RNG state."""
+        game = Game2048(self.is_ai, self.max_tile, self.ai_depth, self.ai_time_budget, self.seed, self.state,
+                        self.size)
+        game.rng.setstate(self.rng.getstate())
+        game.move_count = self.move_count
+        return game
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        self._state = value
+        self._board = None
+        self._terms = None  # heuristic terms, rebuilt on the next evaluate
+
+    # NumPy view of the packed board, decoded once per position
+    @property
+    def board(self):
+        if self._board is None:
+            self._board = self.layout.to_array(self._state)
+            self._board.flags.writeable = False
+        return self._board
+
+    @board.setter
+    def board(self, value):
+        self.state = self.layout.from_array(value)
+
+    def add_random_tile(self):
+        """Spawn a 2 (90%) or 4 in a random empty cell; return (shift, exponent) or None if full.
+
+        Every spawn takes exactly two draws from the RNG, one for the cell and
+        one for the value, so games from the same seed consume the same
+        stream move for move whatever their boards look like.
+        """
+        empty_cells = self.layout.empty_cells(self.state)
+        if empty_cells:
+            # Not rng.choice, which draws a varying number of bits depending on len(empty_cells)
+            shift = empty_cells[int(self.rng.random() * len(empty_cells))]
+            exponent = 1 if self.rng.random() < 0.9 else 2
+            self.add_tile(shift, exponent)
+            return shift, exponent
+        return None
+
+    def add_tile(self, shift, exponent):
+        """Place tile 2 ** exponent in the empty cell at bit offset ``shift``."""
+        terms = self._terms
+        self.state |= exponent << shift
+        if terms is not None:
+            self._terms = terms.spawn(shift, exponent)
+
+    def move(self, direction, spawn=True):
+        new_state = self.layout.move(self.state, direction)
+        moved = new_state != self.state
+        if moved:
+            terms = self._terms
+            self.move_count += 1
+            self.state = new_state
+            if terms is not None:
+                self._terms = terms.moved(new_state)
+            tile = self.add_random_tile() if spawn else None
+            if self.recorder is not None:
+                self.recorder.record(direction, tile)
+
+        return moved
+
+    # Row-table check for an empty cell or two equal neighbours, see bitboard.Layout.can_move
+    def can_move(self):
+        return self.layout.can_move(self.state)
+
+    def is_game_over(self):
+        return not self.layout.can_move(self.state)
+
+    def has_won(self):
+        return np.any(self.board == self.max_tile)
+
+    def get_score(self):
+        return np.max(self.board)
+
+    # Utility function to evaluate board state, kept up to date across moves and spawns
+    def evaluate(self):
+        terms = self.line_terms()
+        if self._terms is None or self._terms.terms is not terms:
+            self._terms = heuristic.HeuristicState(self.state, terms=terms)
+        return self._terms.score()
+
+    def line_terms(self):
+        """Evaluation tables for this game's layout and weights."""
+        if self.weights is None:
+            return heuristic.line_terms(self.layout)
+        return evaluator.tuned_terms(self.layout, self.weights)
+
+    # Batched counterparts of move and evaluate over (N, size, size) arrays of any size, see batch.py
+    @staticmethod
+    def move_batch(boards, direction=None):
+        return batch.move_boards(boards, direction)
+
+    @staticmethod
+    def evaluate_batch(boards):
+        return batch.evaluate_boards(boards)
+
+    # Expectimax search to find the best move
+    def get_best_move(self):
+        terms = self.line_terms()
+        if self.search is None or self.search.terms is not terms:
+            self.search = ExpectimaxSearch(max_depth=self.ai_depth, time_budget=self.ai_time_budget, layout=self.layout,
+                                           terms=terms)
+        self.search.book = self.book
+        if self.profiler is None:
+            return self.search.best_move(self.state)[0]
+        start = time.perf_counter()
+        best_move, _ = self.search.best_move(self.state)
+        self.profiler.search(self.search.stats, time.perf_counter() - start)
+        return best_move
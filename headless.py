@@ -0,0 +1,136 @@
+"""Headless AI self-play for tuning and regression checks.
+
+Runs many Game2048 AI games across a process pool without pygame and streams
+one result per game to a JSONL or CSV file as games finish:
+
+    python headless.py --games 1000 --depth 2 --max-tile 2048 --out results.jsonl
+
+Game i is seeded with ``--seed + i``, so a run is reproducible game by game
+as long as no ``--time-budget`` is set (a time budget makes the search depth
+depend on machine speed).
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+import time
+from functools import lru_cache
+
+from evaluator import Weights
+from game import Game2048
+
+FIELDS = ["game", "seed", "size", "ai_depth", "target", "weights", "moves", "max_tile", "won", "wall_time"]
+
+# Loaded once per worker process rather than once per game
+_load_weights = lru_cache(maxsize=None)(Weights.load)
+
+
+def play_game(game_index, seed, max_tile=4096, ai_depth=2, ai_time_budget=None, max_moves=None, size=7,
+              weights_path=None, on_move=None):
+    """Play one AI game to the end and return its result row.
+
+    ``on_move``, if given, is called with the game after every move.
+    """
+    game = Game2048(is_ai=True, max_tile=max_tile, ai_depth=ai_depth, ai_time_budget=ai_time_budget, seed=seed,
+                    size=size)
+    if weights_path is not None:
+        game.weights = _load_weights(weights_path)
+    start = time.perf_counter()
+    while not game.has_won() and not game.is_game_over():
+        if max_moves is not None and game.move_count >= max_moves:
+            break
+        game.move(game.get_best_move())
+        if on_move is not None:
+            on_move(game)
+    return {
+        "game": game_index,
+        "seed": seed,
+        "size": size,
+        "ai_depth": ai_depth,
+        "target": max_tile,
+        "weights": weights_path,
+        "moves": game.move_count,
+        "max_tile": int(game.get_score()),
+        "won": bool(game.has_won()),
+        "wall_time": round(time.perf_counter() - start, 4),
+    }
+
+
+def _play(job):
+    return play_game(*job)
+
+
+class ResultWriter:
+    """Append result rows to a .jsonl or .csv file, flushing every row."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.csv = None
+        if path.endswith(".csv"):
+            self.csv = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.csv is not None:
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def run(games, seed=0, max_tile=4096, ai_depth=2, ai_time_budget=None, max_moves=None, workers=None, size=7,
+        weights_path=None):
+    """Yield result rows as the pool finishes games; each row's ``game`` is its index."""
+    jobs = [(i, seed + i, max_tile, ai_depth, ai_time_budget, max_moves, size, weights_path) for i in range(games)]
+    with multiprocessing.Pool(processes=workers) as pool:
+        yield from pool.imap_unordered(_play, jobs)
+
+
+def power_of_two(text):
+    """argparse type for a target tile."""
+    value = int(text)
+    if value < 4 or value & (value - 1):
+        raise argparse.ArgumentTypeError(f"{text} is not a power of two")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Game2048 AI self-play without a display.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--max-tile", type=power_of_two, default=4096, help="target tile, any power of two")
+    parser.add_argument("--size", type=int, default=7, help="board size (N x N)")
+    parser.add_argument("--depth", type=int, default=2, help="AI search depth (Easy 1, Medium 2, Hard 3)")
+    parser.add_argument("--time-budget", type=float, default=None, help="seconds of search per move")
+    parser.add_argument("--max-moves", type=int, default=None, help="stop a game after this many moves")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--weights", default=None, help="tuned evaluator weights (default: the fixed heuristic)")
+    parser.add_argument("--out", default="results.jsonl", help="output file, .jsonl or .csv")
+    args = parser.parse_args(argv)
+
+    writer = ResultWriter(args.out)
+    played = wins = moves = 0
+    start = time.perf_counter()
+    try:
+        for row in run(args.games, args.seed, args.max_tile, args.depth, args.time_budget, args.max_moves, args.workers,
+                       args.size, args.weights):
+            writer.write(row)
+            played += 1
+            wins += row["won"]
+            moves += row["moves"]
+            print(f"\r{played}/{args.games} games, win rate {wins / played:.1%}", end="", file=sys.stderr)
+    finally:
+        writer.close()
+    print(file=sys.stderr)
+    if played:
+        print(f"{played} games in {time.perf_counter() - start:.1f}s: "
+              f"win rate {wins / played:.1%}, mean moves {moves / played:.1f}")
+
+
+if __name__ == "__main__":
+    main()
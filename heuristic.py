@@ -0,0 +1,166 @@
+"""Board evaluation on packed boards.
+
+Same formula as Game2048.evaluate (10 * max_tile + 2 * empty_cells +
+smoothness), but every term is read from per-line tables: rows give the
+empty count, max tile and horizontal smoothness, and the rows of the
+transposed board give the vertical smoothness.
+
+LineTerms holds those tables for one board layout, and DEFAULT is the one
+for the default 7x7 layout. Other evaluators (see evaluator.py) subclass it
+with their own line tables and plug into the search unchanged.
+HeuristicState keeps the per-line terms for one board so that a tile spawn
+or a slide only updates the lines it touched, and reading the score is O(1).
+"""
+
+import bitboard
+from bitboard import RowTable
+
+
+class LineTerms:
+    """Per-line evaluation tables for one bitboard.Layout.
+
+    A board scores the sum of ``row_term`` over its rows and ``col_term`` over
+    its columns, plus ``max_weight`` times the largest ``row_max``.
+    ``tile_values`` gives row_max's value of a lone tile per exponent.
+    """
+
+    max_weight = 10
+
+    def __init__(self, layout):
+        self.layout = layout
+        # Row terms carry the empty cells, columns only add their smoothness
+        self.row_term = RowTable(lambda row: 2 * layout.row_cells(row).count(0) + self._smoothness(row))
+        self.col_term = RowTable(self._smoothness)
+        self.row_max = RowTable(lambda row: max(self._values(row)))
+        self.tile_values = (0,) + tuple(1 << e for e in range(1, layout.max_exponent + 1))
+        # For a cell's bit offset: (row offset, offset within the row, column offset, offset within the column)
+        stride, bits = layout.row_stride, layout.cell_bits
+        self.geometry = {
+            shift: (shift - shift % stride, shift % stride, stride * (shift % stride // bits), bits * (shift // stride))
+            for shift in layout.cell_shifts
+        }
+
+    def __reduce__(self):
+        # Row tables hold closures; pickle as a reference to the shared tables instead
+        return line_terms, (self.layout,)
+
+    def _values(self, row):
+        return [1 << e if e else 0 for e in self.layout.row_cells(row)]
+
+    def _smoothness(self, row):
+        values = self._values(row)
+        return -sum(abs(a - b) for a, b in zip(values, values[1:]))
+
+    def evaluate(self, board):
+        layout = self.layout
+        row_term, col_term, row_max, row_mask = self.row_term, self.col_term, self.row_max, layout.row_mask
+        columns = layout.transpose(board)
+        score = 0
+        max_tile = 0
+        for shift in layout.row_shifts:
+            row = (board >> shift) & row_mask
+            score += row_term[row] + col_term[(columns >> shift) & row_mask]
+            top = row_max[row]
+            if top > max_tile:
+                max_tile = top
+        return score + self.max_weight * max_tile
+
+
+_line_terms = {}
+
+
+def line_terms(layout):
+    """Shared LineTerms for ``layout``."""
+    if layout not in _line_terms:
+        _line_terms[layout] = LineTerms(layout)
+    return _line_terms[layout]
+
+
+DEFAULT = line_terms(bitboard.DEFAULT)
+
+
+class HeuristicState:
+    """The evaluation terms of one board, updated by deltas as the board changes."""
+
+    __slots__ = ("board", "columns", "lines", "max_tile", "terms")
+
+    def __init__(self, board, columns=None, lines=None, max_tile=None, terms=DEFAULT):
+        self.board = board
+        self.terms = terms
+        layout = terms.layout
+        self.columns = layout.transpose(board) if columns is None else columns
+        if lines is None:
+            row_term, col_term, row_max, row_mask, columns = (terms.row_term, terms.col_term, terms.row_max,
+                                                              layout.row_mask, self.columns)
+            lines = max_tile = 0
+            for shift in layout.row_shifts:
+                row = (board >> shift) & row_mask
+                lines += row_term[row] + col_term[(columns >> shift) & row_mask]
+                top = row_max[row]
+                if top > max_tile:
+                    max_tile = top
+        self.lines = lines
+        self.max_tile = max_tile
+
+    def score(self):
+        return self.lines + self.terms.max_weight * self.max_tile
+
+    def _spawned(self, shift, exponent):
+        terms = self.terms
+        row_term, col_term, row_mask = terms.row_term, terms.col_term, terms.layout.row_mask
+        row_shift, in_row, col_shift, in_col = terms.geometry[shift]
+        row = (self.board >> row_shift) & row_mask
+        col = (self.columns >> col_shift) & row_mask
+        lines = (self.lines - row_term[row] + row_term[row | exponent << in_row]
+                 - col_term[col] + col_term[col | exponent << in_col])
+        max_tile = max(self.max_tile, terms.tile_values[exponent])
+        return lines, max_tile, exponent << (row_shift + in_row), exponent << (col_shift + in_col)
+
+    def spawn_score(self, shift, exponent):
+        """Score of the board with a new tile at ``shift``, without building its state."""
+        lines, max_tile, _, _ = self._spawned(shift, exponent)
+        return lines + self.terms.max_weight * max_tile
+
+    def spawn_total(self, cells, spawns):
+        """Sum of ``p * spawn_score(shift, exponent)`` over ``cells`` and (exponent, p) ``spawns``.
+
+        The search's leaf chance nodes call this; each cell's row and column
+        are looked up once for all its spawns.
+        """
+        terms = self.terms
+        row_term, col_term, row_mask, geometry = terms.row_term, terms.col_term, terms.layout.row_mask, terms.geometry
+        tile_values, max_weight, max_tile = terms.tile_values, terms.max_weight, self.max_tile
+        board, columns, lines = self.board, self.columns, self.lines
+        total = 0.0
+        for shift in cells:
+            row_shift, in_row, col_shift, in_col = geometry[shift]
+            row = (board >> row_shift) & row_mask
+            col = (columns >> col_shift) & row_mask
+            rest = lines - row_term[row] - col_term[col]
+            for exponent, p in spawns:
+                top = tile_values[exponent]
+                total += p * (rest + row_term[row | exponent << in_row] + col_term[col | exponent << in_col]
+                              + max_weight * (top if top > max_tile else max_tile))
+        return total
+
+    def spawn(self, shift, exponent):
+        lines, max_tile, tile, column_tile = self._spawned(shift, exponent)
+        return HeuristicState(self.board | tile, self.columns | column_tile, lines, max_tile, self.terms)
+
+    def moved(self, board):
+        """State of ``board`` reached from this one by a slide; only changed lines are rescored."""
+        terms = self.terms
+        layout = terms.layout
+        row_term, col_term, row_mask = terms.row_term, terms.col_term, layout.row_mask
+        columns = layout.transpose(board)
+        lines = self.lines
+        max_tile = self.max_tile  # slides never shrink a tile
+        for shift in layout.row_shifts:
+            old, new = (self.board >> shift) & row_mask, (board >> shift) & row_mask
+            if old != new:
+                lines += row_term[new] - row_term[old]
+                max_tile = max(max_tile, terms.row_max[new])
+            old, new = (self.columns >> shift) & row_mask, (columns >> shift) & row_mask
+            if old != new:
+                lines += col_term[new] - col_term[old]
+        return HeuristicState(board, columns, lines, max_tile, terms)
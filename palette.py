@@ -0,0 +1,34 @@
+"""Board colors shared by Main.py and the arena dashboard.
+
+Plain RGB tuples with no pygame state, so importing this never touches a
+display.
+"""
+
+import colorsys
+
+BACKGROUND_COLOR = (187, 173, 160)
+
+TILE_COLORS = {
+    0: (204, 192, 179),
+    2: (238, 228, 218),
+    4: (237, 224, 200),
+    8: (242, 177, 121),
+    16: (245, 149, 99),
+    32: (245, 158, 122),
+    64: (245, 121, 72),
+    128: (237, 207, 114),
+    256: (237, 204, 97),
+    512: (237, 200, 80),
+    1024: (237, 197, 63),
+    2048: (237, 194, 46),
+    4096: (237, 191, 23),
+}
+
+
+def tile_color(tile_value):
+    """Color of a tile; tiles past TILE_COLORS get a generated color per exponent."""
+    if tile_value in TILE_COLORS:
+        return TILE_COLORS[tile_value]
+    # Step around the hue wheel so neighbouring exponents stay distinguishable
+    hue = (int(tile_value).bit_length() - 13) * 47 % 360
+    return tuple(round(channel * 255) for channel in colorsys.hsv_to_rgb(hue / 360, 0.6, 0.85))
@@ -0,0 +1,188 @@
+"""Expectimax with the root split across a process pool.
+
+The root's legal moves times the sampled first-ply spawns (up to 4 x 8
+subtrees) are searched as independent tasks, and the chance-node averages are
+rebuilt from their values. Worker processes live as long as the search, so
+their transposition tables stay warm from move to move. Each worker is told
+the shared deadline and watches a shared counter, so a timeout or a newer
+request stops every subtree at once.
+
+    depth = scaled_depth(3)
+    search = ParallelSearch(max_depth=depth, prob_cutoff=scaled_cutoff(depth, 3), time_budget=0.1)
+    direction, value = search.best_move(board)
+    search.close()
+
+Whether splitting pays off depends on the core count, so the gain is
+measured against the serial search rather than assumed:
+
+    python parallel.py --workers 4 --budget 0.1
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+import bitboard
+from expectimax import DIRECTIONS, SPAWNS, ExpectimaxSearch, SearchTimeout
+from game import Game2048
+
+_worker = None  # (ExpectimaxSearch, cancel counter) in each pool process
+
+
+def scaled_depth(depth, workers=None):
+    """Search depth for ``workers`` cores: one more ply per doubling of the core count."""
+    workers = workers or os.cpu_count() or 1
+    return depth + workers.bit_length() - 1
+
+
+def scaled_cutoff(depth, base_depth, prob_cutoff=1e-3, spawn_samples=4):
+    """Probability cutoff for a ``depth``-ply search that prunes like ``prob_cutoff`` at ``base_depth``.
+
+    Every ply multiplies the reach probability of the likeliest child (a 2
+    in one of the sampled cells) by 0.9 / spawn_samples, so a fixed cutoff
+    would stop the deeper plies before the depth limit does.
+    """
+    return prob_cutoff * (SPAWNS[0][1] / spawn_samples) ** max(0, depth - base_depth)
+
+
+def _init_worker(cancel, prob_cutoff, spawn_samples, table_size, layout, terms):
+    global _worker
+    _worker = (ExpectimaxSearch(prob_cutoff=prob_cutoff, spawn_samples=spawn_samples,
+                                table_size=table_size, layout=layout, terms=terms), cancel)
+
+
+def _search_task(task):
+    """Value of one first-ply spawn board, or None if it was cancelled or ran out of time."""
+    board, depth, prob, deadline, generation = task
+    search, cancel = _worker
+    search.stats = {"nodes": 0, "tt_hits": 0, "depth": depth}
+    search._deadline = deadline
+    search._interruptible = True
+    search.should_stop = lambda: cancel.value != generation
+    if search._stopped():
+        return None, search.stats
+    try:
+        return search._max(board, search.keys.key(board), depth, prob), search.stats
+    except SearchTimeout:
+        return None, search.stats
+
+
+class ParallelSearch(ExpectimaxSearch):
+    def __init__(self, max_depth=3, prob_cutoff=1e-3, spawn_samples=4, time_budget=None, table_size=1 << 18,
+                 layout=bitboard.DEFAULT, terms=None, workers=None):
+        super().__init__(max_depth, prob_cutoff, spawn_samples, time_budget, table_size, layout, terms)
+        # Spawn so workers do not inherit pygame state, see ai_worker.py
+        context = multiprocessing.get_context("spawn")
+        self.workers = workers or os.cpu_count() or 1
+        self.cancel = context.Value("i", 0, lock=False)
+        self.pool = context.Pool(self.workers, _init_worker,
+                                 (self.cancel, prob_cutoff, spawn_samples, table_size, layout, self.terms))
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def _split(self, board):
+        """First-ply tasks as (board, probability) and their (direction, weight) for averaging."""
+        tasks, weights = [], []
+        for direction in DIRECTIONS:
+            child = self.layout.move(board, direction)
+            if child == board:
+                continue
+            empty_cells = self._empty_cells(child)
+            n = len(empty_cells)
+            if n > self.spawn_samples:
+                empty_cells = empty_cells[::-(-n // self.spawn_samples)]
+            for exponent, p in SPAWNS:
+                for shift in empty_cells:
+                    tasks.append((child | exponent << shift, p / len(empty_cells)))
+                    weights.append((direction, p / len(empty_cells)))
+        return tasks, weights
+
+    def _root(self, board, depth):
+        if depth < 2:
+            return super()._root(board, depth)
+
+        tasks, weights = self._split(board)
+        self.cancel.value += 1  # stop anything still running for an earlier request
+        generation = self.cancel.value
+        deadline = self._deadline if self._interruptible else None
+        pending = self.pool.map_async(
+            _search_task, [(child, depth - 1, prob, deadline, generation) for child, prob in tasks], chunksize=1)
+        while not pending.ready():
+            pending.wait(0.002)
+            if self._interruptible and self._stopped():
+                self.cancel.value += 1
+                raise SearchTimeout()
+        results = pending.get()
+        for _, stats in results:
+            self.stats["nodes"] += stats["nodes"]
+            self.stats["tt_hits"] += stats["tt_hits"]
+        if any(value is None for value, _ in results):
+            raise SearchTimeout()
+
+        totals = {}
+        for (direction, weight), (value, _) in zip(weights, results):
+            totals[direction] = totals.get(direction, 0.0) + weight * value
+        self.stats["depth"] = depth
+        if not totals:
+            return None, self.evaluate(board)
+        best_move = max(totals, key=totals.get)  # first of equal values in DIRECTIONS order, as in the serial root
+        return best_move, totals[best_move]
+
+
+def positions(count, seed=0, spacing=50):
+    """Seeded boards from depth-1 self-play, one every ``spacing`` moves."""
+    boards, game_seed = [], seed
+    while len(boards) < count:
+        game = Game2048(is_ai=True, ai_depth=1, seed=game_seed, max_tile=32768)
+        while not game.is_game_over() and len(boards) < count:
+            game.move(game.get_best_move())
+            if game.move_count % spacing == 0 and game.layout.can_move(game.state):
+                boards.append(game.state)
+        game_seed += 1
+    return boards
+
+
+def measure(search, boards):
+    """Per-board (depth reached, nodes, seconds) of ``search.best_move``."""
+    rows = []
+    for board in boards:
+        start = time.perf_counter()
+        search.best_move(board)
+        rows.append((search.stats["depth"], search.stats["nodes"], time.perf_counter() - start))
+    return np.array(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the parallel search with the serial one under a time budget.")
+    parser.add_argument("--workers", type=int, default=None, help="pool processes (default: all cores)")
+    parser.add_argument("--depth", type=int, default=3, help="serial depth limit; the parallel one is scaled from it")
+    parser.add_argument("--budget", type=float, default=0.1, help="seconds of search per move")
+    parser.add_argument("--positions", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    boards = positions(args.positions, args.seed)
+    depth = scaled_depth(args.depth, workers)
+    searches = {
+        "serial": ExpectimaxSearch(max_depth=args.depth, time_budget=args.budget),
+        f"parallel x{workers}": ParallelSearch(max_depth=depth, prob_cutoff=scaled_cutoff(depth, args.depth),
+                                               time_budget=args.budget, workers=workers),
+    }
+    try:
+        for name, search in searches.items():
+            search.best_move(boards[0])  # start the pool and fill the row tables outside the timing
+            rows = measure(search, boards)
+            print(f"{name}: mean depth {rows[:, 0].mean():.2f}, mean nodes {rows[:, 1].mean():,.0f}, "
+                  f"move time p50 {np.percentile(rows[:, 2], 50):.3f}s p95 {np.percentile(rows[:, 2], 95):.3f}s")
+    finally:
+        searches[f"parallel x{workers}"].close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Opt-in timing of the game loop and the AI search.
+
+A Profiler splits each frame into sections (see SECTIONS) and collects the
+stats of every AI move. It keeps a rolling window of both, renders a short
+summary for the in-game overlay (F3 in Main), and appends one JSON line per
+``flush_interval`` to a metrics file with percentiles and a histogram per
+section. Callers keep it as ``None`` when profiling is off, so a disabled
+profiler costs one ``is None`` check per call site.
+"""
+
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+SECTIONS = ("logic", "render", "input", "ai", "flip")
+BUCKETS_MS = (0, 0.5, 1, 2, 4, 8, 16, 33, 66, float("inf"))  # histogram bucket edges
+
+
+class Profiler:
+    def __init__(self, path=None, window=120, flush_interval=1.0):
+        self.path = path
+        self.file = None if path is None else open(path, "a")
+        self.frames = deque(maxlen=window)  # per frame: tuple of section seconds in SECTIONS order
+        self.searches = deque(maxlen=window)  # per AI move: search stats plus "time"
+        self.flush_interval = flush_interval
+        self.last_flush = time.perf_counter()
+        self.current = dict.fromkeys(SECTIONS, 0.0)
+        self.mark = time.perf_counter()
+
+    def begin_frame(self):
+        self.mark = time.perf_counter()
+
+    def lap(self, section):
+        """Charge the time since the previous mark to ``section``."""
+        now = time.perf_counter()
+        self.current[section] += now - self.mark
+        self.mark = now
+
+    def end_frame(self):
+        self.frames.append(tuple(self.current[section] for section in SECTIONS))
+        self.current = dict.fromkeys(SECTIONS, 0.0)
+        self._maybe_flush()
+
+    def search(self, stats, elapsed=None):
+        """Record one get_best_move: stats as kept by ExpectimaxSearch, plus its wall time."""
+        stats = dict(stats)
+        if elapsed is not None:
+            stats["time"] = elapsed
+        self.searches.append(stats)
+        self._maybe_flush()
+
+    def summary(self):
+        summary = {"frames": len(self.frames), "sections": {}, "search": None}
+        if self.frames:
+            times = np.array(self.frames) * 1000
+            for name, column in zip(SECTIONS + ("frame",), np.column_stack([times, times.sum(axis=1)]).T):
+                summary["sections"][name] = {
+                    "mean_ms": float(column.mean()),
+                    "p50_ms": float(np.percentile(column, 50)),
+                    "p95_ms": float(np.percentile(column, 95)),
+                    "max_ms": float(column.max()),
+                    "histogram": np.histogram(column, bins=BUCKETS_MS)[0].tolist(),
+                }
+        if self.searches:
+            nodes = sum(s.get("nodes", 0) for s in self.searches)
+            seconds = sum(s.get("time", 0.0) for s in self.searches)
+            summary["search"] = {
+                "moves": len(self.searches),
+                "nodes": nodes,
+                "tt_hits": sum(s.get("tt_hits", 0) for s in self.searches),
+                "nodes_per_s": nodes / seconds if seconds else None,
+                "max_depth": max(s.get("depth", 0) for s in self.searches),
+                "mean_ms": 1000 * seconds / len(self.searches),
+            }
+        return summary
+
+    def overlay_lines(self):
+        """Short text lines for the debug overlay."""
+        summary = self.summary()
+        lines = []
+        for name in ("frame",) + SECTIONS:
+            section = summary["sections"].get(name)
+            if section is not None:
+                lines.append(f"{name:<7}{section['mean_ms']:6.2f} ms  p95 {section['p95_ms']:6.2f}  max {section['max_ms']:6.2f}")
+        search = summary["search"]
+        if search is not None:
+            rate = "-" if search["nodes_per_s"] is None else f"{search['nodes_per_s']:,.0f}"
+            lines.append(f"search {search['mean_ms']:6.1f} ms  depth {search['max_depth']}  tt {search['tt_hits']}")
+            lines.append(f"nodes  {search['nodes'] / search['moves']:,.0f}/move  {rate}/s")
+        return lines
+
+    def _maybe_flush(self):
+        if self.file is not None and time.perf_counter() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.perf_counter()
+        if self.file is not None and (self.frames or self.searches):
+            self.file.write(json.dumps(dict(self.summary(), time=time.time(), buckets_ms=BUCKETS_MS[1:-1])) + "\n")
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
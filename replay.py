@@ -0,0 +1,174 @@
+"""Compact binary replays of Game2048 games.
+
+A replay file is a fixed header followed by two bytes per move:
+
+    header  "4096", version, seed (u64), log2 target tile, ai_depth, is_ai,
+            board size, length of the initial packed board (u16), the board
+    move    u16: bits 0-1 direction, bit 2 set for a 4 spawn,
+            bits 3-15 spawn cell index (row-major, 8191 = no spawn)
+
+Positions are rebuilt by fast-forwarding Game2048.move without rendering.
+ReplayPlayer keeps a board snapshot every ``snapshot_interval`` moves so any
+position can be reached with at most that many moves.
+
+    python replay.py game.r4096            # final position and result
+    python replay.py game.r4096 --seek 120 # board after move 120
+    python replay.py game.r4096 --verify   # re-derive every spawn from the seed
+"""
+
+import argparse
+import struct
+
+import bitboard
+from game import Game2048
+
+MAGIC = b"4096"
+VERSION = 1
+HEADER = struct.Struct("<4sBQBBBBH")
+MOVE = struct.Struct("<H")
+DIRECTIONS = ("up", "down", "left", "right")
+NO_SPAWN = 0x1FFF
+
+
+class Replay:
+    def __init__(self, seed, max_tile=4096, ai_depth=3, is_ai=False, initial_state=0, moves=None,
+                 size=bitboard.GRID_SIZE):
+        self.seed = seed
+        self.max_tile = max_tile
+        self.ai_depth = ai_depth
+        self.is_ai = is_ai
+        self.initial_state = initial_state
+        self.size = size
+        self.cell_shifts = bitboard.get_layout(size, max_tile).cell_shifts
+        self.cell_index = {shift: index for index, shift in enumerate(self.cell_shifts)}
+        self.moves = bytearray() if moves is None else bytearray(moves)  # packed u16 per move
+
+    @classmethod
+    def start(cls, game):
+        """Start recording ``game`` from its current position."""
+        replay = cls(game.seed, game.max_tile, game.ai_depth, game.is_ai, game.state, size=game.size)
+        game.recorder = replay
+        return replay
+
+    def record(self, direction, tile):
+        if tile is None:
+            cell, four = NO_SPAWN, 0
+        else:
+            cell, four = self.cell_index[tile[0]], tile[1] - 1
+        self.moves += MOVE.pack(DIRECTIONS.index(direction) | four << 2 | cell << 3)
+
+    def __len__(self):
+        return len(self.moves) // MOVE.size
+
+    def __iter__(self):
+        """Yield (direction, tile) per move, where tile is (shift, exponent) or None."""
+        for (code,) in MOVE.iter_unpack(self.moves):
+            cell = code >> 3
+            if cell == NO_SPAWN:
+                tile = None
+            elif cell < len(self.cell_shifts):
+                tile = (self.cell_shifts[cell], 1 + (code >> 2 & 1))
+            else:
+                raise ValueError("corrupt replay move %#06x" % code)
+            yield DIRECTIONS[code & 3], tile
+
+    def to_bytes(self):
+        board = self.initial_state.to_bytes(-(-self.initial_state.bit_length() // 8), "little")
+        header = HEADER.pack(MAGIC, VERSION, self.seed, self.max_tile.bit_length() - 1, self.ai_depth,
+                             self.is_ai, self.size, len(board))
+        return header + board + bytes(self.moves)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version = data[:4], data[4] if len(data) > 4 else None
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a version %d 4096 replay" % VERSION)
+        _, _, seed, target, ai_depth, is_ai, size, length = HEADER.unpack_from(data)
+        board = data[HEADER.size:HEADER.size + length]
+        return cls(seed, 1 << target, ai_depth, bool(is_ai), int.from_bytes(board, "little"),
+                   data[HEADER.size + length:], size)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayPlayer:
+    """Random access to the positions of a replay."""
+
+    def __init__(self, replay, snapshot_interval=64):
+        self.replay = replay
+        self.snapshot_interval = snapshot_interval
+        self.moves = list(replay)
+        self.snapshots = []
+        game = self._start()
+        for index, (direction, tile) in enumerate(self.moves):
+            if index % snapshot_interval == 0:
+                self.snapshots.append(game.state)
+            self._apply(game, direction, tile)
+        self.final = game
+
+    def __len__(self):
+        return len(self.moves)
+
+    def _start(self, state=None):
+        replay = self.replay
+        return Game2048(replay.is_ai, replay.max_tile, replay.ai_depth, seed=replay.seed,
+                        state=replay.initial_state if state is None else state, size=replay.size)
+
+    @staticmethod
+    def _apply(game, direction, tile):
+        if not game.move(direction, spawn=False):
+            raise ValueError("replay move %d (%s) does not change the board" % (game.move_count + 1, direction))
+        if tile is not None:
+            game.add_tile(*tile)
+
+    def seek(self, move_index):
+        """Game2048 positioned after the first ``move_index`` moves."""
+        if not 0 <= move_index <= len(self.moves):
+            raise IndexError("replay has %d moves" % len(self.moves))
+        if move_index == len(self.moves):
+            return self.final.copy()
+        snapshot = move_index // self.snapshot_interval
+        game = self._start(self.snapshots[snapshot])
+        game.move_count = snapshot * self.snapshot_interval
+        for direction, tile in self.moves[game.move_count:move_index]:
+            self._apply(game, direction, tile)
+        return game
+
+    def verify(self):
+        """Check that the seed reproduces the initial board and every recorded spawn."""
+        replay = self.replay
+        game = Game2048(replay.is_ai, replay.max_tile, replay.ai_depth, seed=replay.seed, size=replay.size)
+        if game.state != replay.initial_state:
+            return False
+        for direction, tile in self.moves:
+            game.move(direction, spawn=False)
+            if game.add_random_tile() != tile:
+                return False
+        return game.state == self.final.state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect a 4096 game replay.")
+    parser.add_argument("path")
+    parser.add_argument("--seek", type=int, default=None, help="show the board after this many moves")
+    parser.add_argument("--verify", action="store_true", help="check every spawn against the seed")
+    args = parser.parse_args(argv)
+
+    player = ReplayPlayer(Replay.load(args.path))
+    game = player.seek(len(player) if args.seek is None else args.seek)
+    print(game.board)
+    print(f"move {game.move_count}/{len(player)}, max tile {game.get_score()}, "
+          f"{'won' if game.has_won() else 'game over' if game.is_game_over() else 'in progress'}")
+    if args.verify:
+        print("seed reproduces every spawn" if player.verify() else "spawns do NOT match the seed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Match outcomes, Elo updates and likelihood of superiority."""
+
+import argparse
+
+import pytest
+
+from arena import Ratings, outcome, parse_config
+
+
+def result(won, max_tile, moves):
+    return {"won": won, "max_tile": max_tile, "moves": moves}
+
+
+def test_outcome():
+    assert outcome(result(True, 4096, 900), result(False, 8192, 2000)) == 1.0  # a win beats any loss
+    assert outcome(result(True, 4096, 900), result(True, 4096, 1000)) == 1.0  # the faster win
+    assert outcome(result(False, 1024, 500), result(False, 2048, 400)) == 0.0  # the bigger tile
+    assert outcome(result(False, 1024, 500), result(False, 1024, 400)) == 1.0  # then the longer game
+    assert outcome(result(False, 1024, 500), result(False, 1024, 500)) == 0.5
+
+
+def test_update_moves_ratings_by_expected_score():
+    ratings = Ratings(["a", "b", "c"], k=16)
+    ratings.update("a", "b", 1.0)
+    assert ratings.ratings["a"] == pytest.approx(1508) and ratings.ratings["b"] == pytest.approx(1492)
+    ratings.update("b", "a", 0.5)  # stored as a's result against b
+    assert ratings.records["a", "b"] == [1, 1, 0]
+    assert ratings.ratings["a"] + ratings.ratings["b"] == pytest.approx(3000)
+    assert ratings.ratings["a"] < 1508  # a draw against a weaker side costs rating
+    ratings.update("c", "a", 1.0)
+    assert ratings.records["a", "c"] == [0, 0, 1]
+    assert sum(ratings.ratings.values()) == pytest.approx(4500)
+
+
+def test_los():
+    assert Ratings.los(0, 0) == 0.5
+    assert Ratings.los(5, 5) == pytest.approx(0.5)
+    assert Ratings.los(10, 0) > 0.99
+    assert Ratings.los(3, 7) == pytest.approx(1 - Ratings.los(7, 3))
+
+
+def test_parse_config():
+    config = parse_config("hard:depth=3,budget=0.1,weights=w.npz")
+    assert (config.name, config.depth, config.time_budget, config.weights) == ("hard", 3, 0.1, "w.npz")
+    assert parse_config("easy").depth == 2
+    for text in (":depth=1", "x:speed=2"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_config(text)
@@ -0,0 +1,63 @@
+"""Batched moves, evaluation and game-over checks against the original list-based engine."""
+
+import numpy as np
+import pytest
+
+import batch
+from test_bitboard import SIZES, random_grids, reference_evaluate, reference_move, stuck_grid
+
+
+def merge_score(line):
+    """Sum of the tiles created by sliding ``line`` left, as in the original merge."""
+    tiles = [num for num in line if num != 0]
+    score, i = 0, 0
+    while i < len(tiles) - 1:
+        if tiles[i] == tiles[i + 1]:
+            score += 2 * tiles[i]
+            i += 2
+        else:
+            i += 1
+    return score
+
+
+def reference_score(grid, direction):
+    grid = np.array(grid)
+    lines = {"left": grid, "right": grid[:, ::-1], "up": grid.T, "down": grid.T[:, ::-1]}[direction]
+    return sum(merge_score(list(line)) for line in lines)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_move_boards_matches_reference(size):
+    grids = np.stack(list(random_grids(size, 50, 400 + size)))
+    for direction in batch.DIRECTIONS:
+        boards, moved, scores = batch.move_boards(grids, direction)
+        for grid, board, board_moved, score in zip(grids, boards, moved, scores):
+            expected = reference_move(grid, direction)
+            np.testing.assert_array_equal(board, expected, err_msg=f"{direction}\n{grid}")
+            assert board_moved == (not np.array_equal(expected, grid))
+            assert score == reference_score(grid, direction)
+
+
+def test_move_boards_all_directions():
+    grids = np.stack(list(random_grids(7, 20, 500)))
+    boards, moved, scores = batch.move_boards(grids)
+    assert boards.shape == (4, 20, 7, 7) and moved.shape == scores.shape == (4, 20)
+    for i, direction in enumerate(batch.DIRECTIONS):
+        single = batch.move_boards(grids, direction)
+        for part, expected in zip((boards[i], moved[i], scores[i]), single):
+            np.testing.assert_array_equal(part, expected)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_evaluate_boards_matches_reference(size):
+    grids = np.stack(list(random_grids(size, 40, 600 + size)))
+    np.testing.assert_array_equal(batch.evaluate_boards(grids), [reference_evaluate(grid) for grid in grids])
+
+
+def test_can_move_boards():
+    grids = [stuck_grid(5), stuck_grid(5, 2048, 1024), np.zeros((5, 5), dtype=int)]
+    for i, j in ((0, 1), (1, 0)):
+        grid = stuck_grid(5)
+        grid[i, j] = grid[0, 0]
+        grids.append(grid)
+    np.testing.assert_array_equal(batch.can_move_boards(np.stack(grids)), [False, False, True, True, True])
@@ -0,0 +1,137 @@
+"""Packed moves, game-over checks and evaluation against the original list-based engine."""
+
+import random
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+import bitboard
+import heuristic
+
+SIZES = range(4, 11)
+DIRECTIONS = ("up", "down", "left", "right")
+
+
+def merge_line(line):
+    """The original Game2048.move merge, on tile values."""
+    non_zero = [num for num in line if num != 0]
+    merged = []
+    skip = False
+    for i in range(len(non_zero)):
+        if skip:
+            skip = False
+            continue
+        if i < len(non_zero) - 1 and non_zero[i] == non_zero[i + 1]:
+            merged.append(non_zero[i] * 2)
+            skip = True
+        else:
+            merged.append(non_zero[i])
+    return merged + [0] * (len(line) - len(merged))
+
+
+def reference_move(grid, direction):
+    grid = np.array(grid)
+    if direction in ("up", "down"):
+        return reference_move(grid.T, "left" if direction == "up" else "right").T
+    if direction == "right":
+        return np.array([merge_line(list(row[::-1]))[::-1] for row in grid])
+    return np.array([merge_line(list(row)) for row in grid])
+
+
+def reference_evaluate(grid):
+    """The original Game2048.evaluate: 10 * max tile + 2 * empty cells + smoothness."""
+    grid = np.array(grid)
+    smoothness = -np.abs(np.diff(grid, axis=0)).sum() - np.abs(np.diff(grid, axis=1)).sum()
+    return 10 * grid.max() + 2 * np.count_nonzero(grid == 0) + smoothness
+
+
+def random_grids(size, count, seed):
+    """Boards from nearly empty to full, with tiles up to 2048 and plenty of equal neighbours."""
+    rng = random.Random(seed)
+    for i in range(count):
+        fill = i / (count - 1)
+        top = rng.randint(1, 11)
+        yield np.array([[1 << rng.randint(1, top) if rng.random() < fill else 0 for _ in range(size)]
+                        for _ in range(size)])
+
+
+def stuck_grid(size, low=2, high=4):
+    return np.array([[high if (i + j) % 2 else low for j in range(size)] for i in range(size)])
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_move_matches_reference(size):
+    layout = bitboard.get_layout(size, 4096)
+    for grid in random_grids(size, 60, size):
+        board = layout.from_array(grid)
+        for direction in DIRECTIONS:
+            np.testing.assert_array_equal(layout.to_array(layout.move(board, direction)),
+                                          reference_move(grid, direction), err_msg=f"{direction}\n{grid}")
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_can_move_matches_reference(size):
+    layout = bitboard.get_layout(size, 4096)
+    grids = list(random_grids(size, 40, 100 + size)) + [stuck_grid(size), stuck_grid(size, 2048, 1024)]
+    # A stuck board with one pair of equal neighbours, horizontal then vertical
+    for i, j in ((0, 1), (1, 0)):
+        grid = stuck_grid(size)
+        grid[i, j] = grid[0, 0]
+        grids.append(grid)
+    for grid in grids:
+        # The original is_game_over: not over while a cell is empty or some move changes the board
+        expected = (grid == 0).any() or any(not np.array_equal(reference_move(grid, d), grid) for d in DIRECTIONS)
+        assert layout.can_move(layout.from_array(grid)) == expected, grid
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_evaluate_matches_reference(size):
+    layout = bitboard.get_layout(size, 4096)
+    terms = heuristic.line_terms(layout)
+    for grid in random_grids(size, 40, 200 + size):
+        assert terms.evaluate(layout.from_array(grid)) == reference_evaluate(grid), grid
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_array_round_trip(size):
+    layout = bitboard.get_layout(size, 4096)
+    for grid in random_grids(size, 10, 300 + size):
+        np.testing.assert_array_equal(layout.to_array(layout.from_array(grid)), grid)
+
+
+def test_row_table_evicts_oldest_rows():
+    table = bitboard.RowTable(lambda row: row * 2, max_entries=8)
+    for row in range(20):
+        assert table[row] == row * 2
+    assert len(table) <= 8
+    assert 19 in table and 0 not in table
+    assert table[0] == 0  # recomputed after eviction
+
+
+def test_row_table_shared_between_threads():
+    # The AI thread and the main thread fill and evict the same default tables
+    table = bitboard.RowTable(lambda row: row % 97, max_entries=64)
+    errors = []
+
+    def work(offset):
+        try:
+            for i in range(50000):
+                row = offset + i % 1000
+                assert table[row] == row % 97
+        except Exception as exc:  # checked from the main thread below
+            errors.append(exc)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=work, args=(offset,)) for offset in (0, 100000)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert len(table) <= 64
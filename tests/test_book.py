@@ -0,0 +1,79 @@
+"""Canonical boards and their direction maps, and OpeningBook lookups across symmetries."""
+
+import numpy as np
+import pytest
+
+import bitboard
+from book import DIRECTIONS, RECORD, OpeningBook, _flip, _mirror, canonical, write_book
+from evaluator import Weights
+from game import Game2048
+
+
+def images(board, layout):
+    """The 8 rotations and reflections of ``board``, each with the map of directions into it."""
+    for transposed in (False, True):
+        for mirrored in (False, True):
+            for flipped in (False, True):
+                image = layout.transpose(board) if transposed else board
+                mapping = {d: d for d in DIRECTIONS}
+                if transposed:
+                    mapping = {"up": "left", "left": "up", "down": "right", "right": "down"}
+                if mirrored:
+                    image = _mirror(image, layout)
+                    mapping = {d: {"left": "right", "right": "left"}.get(m, m) for d, m in mapping.items()}
+                if flipped:
+                    image = _flip(image, layout)
+                    mapping = {d: {"up": "down", "down": "up"}.get(m, m) for d, m in mapping.items()}
+                yield image, mapping
+
+
+def played_board(size, moves=30):
+    game = Game2048(is_ai=True, ai_depth=1, seed=size, size=size)
+    for _ in range(moves):
+        game.move(game.get_best_move())
+    return game.state
+
+
+@pytest.mark.parametrize("size", [4, 5, 7])
+def test_canonical_maps_directions(size):
+    layout = bitboard.get_layout(size, 4096)
+    board = played_board(size)
+    image, mapping = canonical(board, layout)
+    for direction in DIRECTIONS:
+        # Sliding the board, or its canonical form the mapped way, gives two images of one board
+        assert canonical(layout.move(board, direction), layout)[0] == \
+            canonical(layout.move(image, mapping[direction]), layout)[0]
+
+
+@pytest.mark.parametrize("size", [4, 7])
+def test_symmetric_boards_share_a_canonical_form(size):
+    layout = bitboard.get_layout(size, 4096)
+    board = played_board(size)
+    forms = {canonical(image, layout)[0] for image, _ in images(board, layout)}
+    assert forms == {canonical(board, layout)[0]}
+
+
+def test_book_answers_symmetric_boards():
+    layout = bitboard.get_layout(5, 4096)
+    board = played_board(5)
+    direction = next(d for d in DIRECTIONS if layout.move(board, d) != board)
+    book = OpeningBook(layout=layout)
+    book.put(board, 3, direction, 12.5)
+    for image, mapping in images(board, layout):
+        assert book.get(image, 3) == (mapping[direction], 12.5)
+        assert book.get(image, 4) is None  # not searched that deep
+
+
+def test_book_file_and_weights(tmp_path):
+    layout = bitboard.get_layout(5, 4096)
+    board = played_board(5)
+    direction = next(d for d in DIRECTIONS if layout.move(board, d) != board)
+    image, mapping = canonical(board, layout)
+    path = str(tmp_path / "book.bin")
+    key = OpeningBook(layout=layout).zobrist(image)
+    records = np.array([(key, 2, DIRECTIONS.index(mapping[direction]), 1.0),
+                        (key, 3, DIRECTIONS.index(mapping[direction]), 2.0)], dtype=RECORD)
+    assert write_book(path, records) == 2
+    assert OpeningBook(path, layout=layout).get(board, 3) == (direction, 2.0)
+    # Entries searched with the built-in heuristic do not answer searches with tuned weights
+    assert OpeningBook(path, layout=layout, weights=Weights()).get(board, 1) is None
@@ -0,0 +1,56 @@
+"""TunedTerms lookups against the vectorized Weights, incremental tuned scores and weight files."""
+
+import numpy as np
+import pytest
+
+import bitboard
+from evaluator import FEATURES, TUPLE_BASE, Weights, exponents_of, tuned_terms
+from test_heuristic import check_incremental
+
+
+def random_weights(tuple_length=3, seed=0):
+    rng = np.random.default_rng(seed)
+    return Weights(rng.normal(size=len(FEATURES)), 0.5, rng.normal(size=TUPLE_BASE ** tuple_length),
+                   tuple_length=tuple_length)
+
+
+@pytest.mark.parametrize("tuple_length", [0, 3, 4])
+@pytest.mark.parametrize("size", [4, 7])
+def test_terms_match_board_values(tuple_length, size):
+    layout = bitboard.get_layout(size, 4096)
+    weights = random_weights(tuple_length)
+    terms = tuned_terms(layout, weights)
+    rng = np.random.default_rng(size)
+    exponents = rng.integers(0, 13, size=(40, size, size)) * (rng.random((40, size, size)) < 0.7)
+    expected = weights.board_values(exponents)
+    for grid, value in zip(exponents, expected):
+        board = layout.from_array(np.where(grid > 0, 1 << grid, 0))
+        assert terms.evaluate(board) == pytest.approx(value)
+
+
+@pytest.mark.parametrize("size", [4, 7, 9])
+def test_incremental_matches_full_evaluate(size):
+    check_incremental(tuned_terms(bitboard.get_layout(size, 4096), random_weights()))
+
+
+def test_exponents_of_tiles():
+    np.testing.assert_array_equal(exponents_of(np.array([[0, 2, 4, 2048]])), [[0, 1, 2, 11]])
+
+
+def test_weights_round_trip(tmp_path):
+    weights = random_weights(seed=1)
+    path = str(tmp_path / "weights.npz")
+    weights.save(path)
+    loaded = Weights.load(path)
+    np.testing.assert_array_equal(loaded.features, weights.features)
+    np.testing.assert_array_equal(loaded.tuples, weights.tuples)
+    assert (loaded.max_weight, loaded.tuple_length) == (weights.max_weight, weights.tuple_length)
+    assert loaded.fingerprint() == weights.fingerprint() != random_weights(seed=2).fingerprint()
+
+
+def test_load_rejects_other_features(tmp_path):
+    path = str(tmp_path / "weights.npz")
+    np.savez(path, names=np.array(FEATURES[:-1]), features=np.zeros(len(FEATURES) - 1), max_weight=0.0,
+             tuples=np.zeros(1), tuple_length=0)
+    with pytest.raises(ValueError):
+        Weights.load(path)
@@ -0,0 +1,86 @@
+"""Zobrist keys, the transposition table and best_move of the expectimax search."""
+
+import numpy as np
+import pytest
+
+import bitboard
+from expectimax import DIRECTIONS, SPAWNS, ExpectimaxSearch, TranspositionTable, zobrist_keys
+from game import Game2048
+
+
+def played_boards(size, seed, moves):
+    game = Game2048(is_ai=True, ai_depth=1, seed=seed, size=size)
+    for _ in range(moves):
+        if game.is_game_over():
+            break
+        game.move(game.get_best_move())
+        yield game.state
+
+
+@pytest.mark.parametrize("size", [4, 6])
+def test_incremental_spawn_keys_match_full_key(size):
+    layout = bitboard.get_layout(size, 4096)
+    keys = zobrist_keys(layout)
+    for board in played_boards(size, seed=size, moves=60):
+        key = keys.key(board)
+        for shift in layout.empty_cells(board):
+            for exponent, _ in SPAWNS:
+                child = board | exponent << shift
+                assert key ^ keys.spawn[shift][exponent] == keys.key(child)
+
+
+def test_best_move_is_legal():
+    layout = bitboard.get_layout(4, 4096)
+    search = ExpectimaxSearch(max_depth=2, layout=layout)
+    for board in played_boards(4, seed=1, moves=30):
+        direction, _ = search.best_move(board)
+        assert direction in DIRECTIONS
+        assert layout.move(board, direction) != board
+
+
+def test_best_move_on_stuck_board():
+    layout = bitboard.get_layout(4, 4096)
+    board = layout.from_array(np.array([[2 if (i + j) % 2 else 4 for j in range(4)] for i in range(4)]))
+    search = ExpectimaxSearch(max_depth=2, layout=layout)
+    assert search.best_move(board) == (None, search.evaluate(board))
+
+
+def test_depth_one_averages_every_spawn():
+    layout = bitboard.get_layout(4, 4096)
+    search = ExpectimaxSearch(max_depth=1, spawn_samples=16, layout=layout)
+
+    def average(board):
+        empty = layout.empty_cells(board)
+        return sum(p * search.evaluate(board | exponent << shift)
+                   for shift in empty for exponent, p in SPAWNS) / len(empty)
+
+    for board in played_boards(4, seed=2, moves=30):
+        children = {d: layout.move(board, d) for d in DIRECTIONS if layout.move(board, d) != board}
+        direction, value = search.best_move(board)
+        assert value == pytest.approx(max(average(child) for child in children.values()))
+        assert value == pytest.approx(average(children[direction]))
+        # A second search answers from the leaf cache with the same result
+        assert search.best_move(board) == (direction, value)
+
+
+def test_table_prefers_deeper_entries():
+    table = TranspositionTable(max_entries=4)
+    table.put(1, 10, 3, 30.0)
+    table.put(1, 10, 2, 20.0)  # shallower, ignored
+    assert table.get(1, 10, 3) == 30.0
+    assert table.get(1, 10, 4) is None  # not deep enough
+    assert table.get(1, 11, 1) is None  # same key, other board
+    table.put(1, 11, 1, 11.0)  # other board with the same key, replaced
+    assert table.get(1, 11, 1) == 11.0
+    assert table.get(1, 10, 1) is None
+
+
+def test_table_evicts_least_recently_used():
+    table = TranspositionTable(max_entries=3)
+    for key in range(3):
+        table.put(key, key, 1, float(key))
+    table.get(0, 0, 1)  # 0 is now the most recently used, 1 the least
+    table.put(3, 3, 1, 3.0)
+    assert len(table) == 3
+    assert table.get(1, 1, 1) is None
+    assert [table.get(key, key, 1) for key in (0, 2, 3)] == [0.0, 2.0, 3.0]
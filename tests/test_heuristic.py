@@ -0,0 +1,62 @@
+"""Incrementally updated HeuristicState against a full evaluation of the same board."""
+
+import numpy as np
+import pytest
+
+import bitboard
+import heuristic
+from game import Game2048
+
+
+def check_incremental(terms):
+    """Play a seeded game through HeuristicState, comparing it with ``terms.evaluate`` at every step."""
+    layout = terms.layout
+    game = Game2048(seed=layout.size, size=layout.size)
+    state = heuristic.HeuristicState(game.state, terms=terms)
+    directions = ("left", "down", "right", "up")
+    for step in range(300):
+        # Rotate through the directions so every line kind changes, skipping moves that do nothing
+        order = directions[step % 4:] + directions[:step % 4]
+        board = next((b for b in (layout.move(game.state, d) for d in order) if b != game.state), None)
+        if board is None:
+            break
+        state = state.moved(board)
+        game.state = board
+        assert state.score() == pytest.approx(terms.evaluate(board))
+        empty = layout.empty_cells(board)
+        shift, exponent = empty[step * 7 % len(empty)], 1 + (step % 10 == 0)
+        assert state.spawn_score(shift, exponent) == pytest.approx(terms.evaluate(board | exponent << shift))
+        state = state.spawn(shift, exponent)
+        game.state |= exponent << shift
+        assert state.board == game.state
+        assert state.columns == layout.transpose(game.state)
+        assert state.score() == pytest.approx(terms.evaluate(game.state))
+    assert step > 50
+
+
+@pytest.mark.parametrize("size", [4, 7, 9])
+def test_incremental_matches_full_evaluate(size):
+    check_incremental(heuristic.line_terms(bitboard.get_layout(size, 4096)))
+
+
+@pytest.mark.parametrize("size", [4, 7, 10])
+def test_moved_matches_full_evaluate_on_random_boards(size):
+    layout = bitboard.get_layout(size, 4096)
+    terms = heuristic.line_terms(layout)
+    rng = np.random.default_rng(size)
+    for _ in range(30):
+        grid = (1 << rng.integers(1, 12, size=(size, size))) * (rng.random((size, size)) < 0.6)
+        state = heuristic.HeuristicState(layout.from_array(grid), terms=terms)
+        assert state.score() == pytest.approx(terms.evaluate(state.board))
+        for direction in ("up", "down", "left", "right"):
+            board = layout.move(state.board, direction)
+            assert state.moved(board).score() == pytest.approx(terms.evaluate(board))
+
+
+def test_game_evaluate_tracks_moves():
+    game = Game2048(is_ai=True, ai_depth=1, seed=1, size=5)
+    for _ in range(200):
+        if game.is_game_over():
+            break
+        game.move(game.get_best_move())
+        assert game.evaluate() == pytest.approx(heuristic.line_terms(game.layout).evaluate(game.state))
@@ -0,0 +1,24 @@
+"""ParallelSearch against the serial search it splits."""
+
+import pytest
+
+from expectimax import ExpectimaxSearch
+from game import Game2048
+from parallel import ParallelSearch
+
+
+@pytest.fixture(scope="module")
+def parallel_search():
+    search = ParallelSearch(max_depth=3, workers=2)
+    yield search
+    search.close()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_serial_without_budget(parallel_search, seed):
+    game = Game2048(is_ai=True, ai_depth=1, seed=seed)
+    for _ in range(40):
+        game.move(game.get_best_move())
+    direction, value = ExpectimaxSearch(max_depth=3).best_move(game.state)
+    assert parallel_search.best_move(game.state) == (direction, pytest.approx(value))
+    assert parallel_search.stats["depth"] == 3
@@ -0,0 +1,92 @@
+import pytest
+
+from game import Game2048
+from replay import MOVE, NO_SPAWN, Replay, ReplayPlayer
+
+
+def recorded_game(size, seed, moves=None, max_tile=256):
+    game = Game2048(is_ai=True, max_tile=max_tile, ai_depth=1, seed=seed, size=size)
+    replay = Replay.start(game)
+    positions = [game.state]
+    while not game.has_won() and not game.is_game_over() and (moves is None or game.move_count < moves):
+        game.move(game.get_best_move())
+        positions.append(game.state)
+    return game, replay, positions
+
+
+@pytest.mark.parametrize("size", [4, 7, 10])
+def test_round_trip(size, tmp_path):
+    game, replay, _ = recorded_game(size, seed=size)
+    path = tmp_path / "game.r4096"
+    replay.save(str(path))
+    loaded = Replay.load(str(path))
+    assert (loaded.seed, loaded.max_tile, loaded.ai_depth, loaded.is_ai, loaded.size) == (size, 256, 1, True, size)
+    assert loaded.initial_state == replay.initial_state
+    assert list(loaded) == list(replay)
+    assert ReplayPlayer(loaded).final.state == game.state
+
+
+@pytest.mark.parametrize("size", [4, 7])
+def test_seek_matches_recorded_positions(size):
+    _, replay, positions = recorded_game(size, seed=10 + size)
+    player = ReplayPlayer(replay, snapshot_interval=16)
+    assert len(player) == len(positions) - 1
+    for index in (0, 1, 15, 16, 17, 63, len(player) // 2, len(player)):
+        game = player.seek(index)
+        assert game.state == positions[index]
+        assert game.move_count == index
+    with pytest.raises(IndexError):
+        player.seek(len(player) + 1)
+
+
+@pytest.mark.parametrize("size, max_tile", [(4, 65536), (10, 65536), (12, 4096)])
+def test_layouts_past_the_default(size, max_tile):
+    # 5-bit cells for targets past 32768, a 16 x 16 frame past 8 x 8
+    game, replay, positions = recorded_game(size, seed=size, moves=300, max_tile=max_tile)
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert (loaded.size, loaded.max_tile, loaded.initial_state) == (size, max_tile, replay.initial_state)
+    player = ReplayPlayer(loaded, snapshot_interval=32)
+    assert player.verify()
+    assert player.seek(len(player) // 2).state == positions[len(player) // 2]
+    assert player.final.state == game.state
+
+
+def test_verify():
+    _, replay, _ = recorded_game(5, seed=3, moves=100)
+    assert ReplayPlayer(replay).verify()
+    other_seed = Replay.from_bytes(replay.to_bytes())
+    other_seed.seed += 1
+    assert not ReplayPlayer(other_seed).verify()
+
+
+def test_same_seed_same_spawns():
+    directions = ["left", "down", "right", "up"] * 50
+    games = [Game2048(seed=seed) for seed in (5, 5, 6)]
+    replays = [Replay.start(game) for game in games]
+    for game in games:
+        for direction in directions:
+            game.move(direction)
+    assert replays[0].initial_state == replays[1].initial_state and replays[0].moves == replays[1].moves
+    assert replays[0].moves != replays[2].moves
+
+
+def test_move_without_spawn():
+    replay = Replay(seed=0, initial_state=Game2048(seed=0).state)
+    replay.record("left", None)
+    assert list(Replay.from_bytes(replay.to_bytes())) == [("left", None)]
+    assert MOVE.unpack(replay.moves)[0] >> 3 == NO_SPAWN
+
+
+def test_rejects_corrupt_moves():
+    replay = Replay(seed=0)
+    replay.moves += MOVE.pack(len(replay.cell_shifts) << 3)
+    with pytest.raises(ValueError):
+        list(replay)
+
+
+def test_rejects_other_files():
+    data = Replay(seed=0).to_bytes()
+    with pytest.raises(ValueError):
+        Replay.from_bytes(b"PNG" + data[3:])
+    with pytest.raises(ValueError):
+        Replay.from_bytes(data[:4] + bytes([data[4] + 1]) + data[5:])